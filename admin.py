@@ -2,9 +2,15 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
-from groq import Groq
-import json
+from clients import ClientPool
+import os
+import threading
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from json_stream import Field, RecordStream, records_to_frame
+from data_store import SharedDataStore
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -30,47 +36,121 @@ except:
 try:
     GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
 except:
-    GROQ_API_KEY = st.secrets.GROQ_API_KEY
+    # No secrets file (local runs, benchmarks): fall back to the environment
+    GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "GROQ_API_KEY")
 
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-except Exception as e:
-    st.error(f"Failed to initialize Groq client: {str(e)}")
-    st.stop()
+@st.cache_resource
+def get_clients():
+    # Built on the first generator call and kept for the life of the process
+    return ClientPool(groq_api_key=GROQ_API_KEY)
+
+groq_client = get_clients().groq
+
+ALERT_SCHEMA = [
+    Field('type', 'category', choices=['Sandstorm', 'Heat Wave', 'Flash Flood', 'Dust Storm',
+                                       'Strong Winds', 'Thunderstorm']),
+    Field('severity', 'category', choices=['Low', 'Medium', 'High']),
+    Field('location', 'category'),
+    Field('time', 'datetime'),
+    Field('description', 'str'),
+]
+
+RESOURCE_SCHEMA = [
+    Field('facility', 'category'),
+    Field('water', 'int', minimum=0),
+    Field('food', 'int', minimum=0),
+    Field('medical', 'int', minimum=0),
+    Field('beds', 'int', minimum=0),
+    Field('current_occupancy', 'int', minimum=0),
+    Field('last_updated', 'datetime'),
+]
 
-def generate_disaster_data(groq_client, scenario_prompt):
+UPDATE_SCHEMA = [
+    Field('source_type', 'category', choices=['Official', 'Healthcare', 'Emergency', 'Media', 'Citizen']),
+    Field('username', 'str'),
+    Field('message', 'str'),
+    Field('location', 'category'),
+    Field('verified', 'bool'),
+    Field('trust_score', 'float', minimum=0.0, maximum=1.0),
+    Field('timestamp', 'datetime'),
+    Field('engagement', 'int', minimum=0),
+]
+
+def stream_records(groq_client, system_prompt, request_template, scenario_prompt, schema,
+                   count=10, max_retries=2, cancel=None):
+    """
+    Stream a JSON array reply and keep each valid record as it arrives.
+    Missing or invalid records are re-requested on their own, up to max_retries times.
+    The frame's attrs carry how many were requested and how many were rejected.
+    Setting the cancel event stops reading and requesting; nothing is returned then.
+    """
+    records = []
+    invalid = 0
+    for _ in range(max_retries + 1):
+        missing = count - len(records)
+        if missing <= 0 or cancel is not None and cancel.is_set():
+            break
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": request_template.format(count=missing, scenario=scenario_prompt)}
+        ]
+        response = groq_client.chat.completions.create(
+            messages=messages,
+            model="mixtral-8x7b-32768",
+            temperature=0.7,
+            max_tokens=1000,
+            stream=True
+        )
+        parser = RecordStream(schema)
+        try:
+            for chunk in response:
+                if cancel is not None and cancel.is_set():
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    records.extend(parser.feed(delta))
+        finally:
+            # Closes the HTTP stream when we stop early
+            response.close()
+        parser.close()
+        invalid += len(parser.invalid)
+    if cancel is not None and cancel.is_set():
+        return pd.DataFrame()
+    df = records_to_frame(records[:count], schema)
+    df.attrs.update(requested=count, invalid=invalid)
+    return df
+
+def generate_disaster_data(groq_client, scenario_prompt, cancel=None):
     """Generate structured disaster alerts data"""
-    messages = [
-        {"role": "system", "content": """You are a disaster data generator for Qatar's emergency management system. 
-        Generate exactly 10 emergency alerts as a JSON array with this exact structure for each alert:
+    system_prompt = """You are a disaster data generator for Qatar's emergency management system. 
+        Generate the requested number of emergency alerts as a JSON array with this exact structure for each alert:
         {
             "type": "one of [Sandstorm, Heat Wave, Flash Flood, Dust Storm, Strong Winds, Thunderstorm]",
             "severity": "one of [Low, Medium, High]",
             "location": "specific Qatar location",
             "time": "current time in YYYY-MM-DD HH:MM format",
             "description": "detailed description of the alert"
-        }"""},
-        {"role": "user", "content": f"Generate 10 structured alerts for: {scenario_prompt}"}
-    ]
-    
+        }"""
+
     try:
-        response = groq_client.chat.completions.create(
-            messages=messages,
-            model="mixtral-8x7b-32768",
-            temperature=0.7,
-            max_tokens=1000
+        return stream_records(
+            groq_client,
+            system_prompt,
+            "Generate {count} structured alerts for: {scenario}",
+            scenario_prompt,
+            ALERT_SCHEMA,
+            cancel=cancel
         )
-        alerts = json.loads(response.choices[0].message.content)
-        return pd.DataFrame(alerts)
     except Exception as e:
-        st.error(f"Error generating disaster data: {str(e)}")
+        # Once cancelled, the page has moved on; don't write into a later rerun
+        if cancel is None or not cancel.is_set():
+            st.error(f"Error generating disaster data: {str(e)}")
         return pd.DataFrame()
 
-def generate_resource_data(groq_client, scenario_prompt):
+def generate_resource_data(groq_client, scenario_prompt, cancel=None):
     """Generate structured facility resource data"""
-    messages = [
-        {"role": "system", "content": """You are a facility resource manager for Qatar's emergency management system. 
-        Generate exactly 10 facility reports as a JSON array with this exact structure for each facility:
+    system_prompt = """You are a facility resource manager for Qatar's emergency management system. 
+        Generate the requested number of facility reports as a JSON array with this exact structure for each facility:
         {
             "facility": "name of Qatar facility",
             "water": "water supply (1000-10000)",
@@ -79,28 +159,27 @@ def generate_resource_data(groq_client, scenario_prompt):
             "beds": "total beds (100-1000)",
             "current_occupancy": "current occupants (less than beds)",
             "last_updated": "current time in YYYY-MM-DD HH:MM format"
-        }"""},
-        {"role": "user", "content": f"Generate 10 structured facility reports for: {scenario_prompt}"}
-    ]
-    
+        }"""
+
     try:
-        response = groq_client.chat.completions.create(
-            messages=messages,
-            model="mixtral-8x7b-32768",
-            temperature=0.7,
-            max_tokens=1000
+        return stream_records(
+            groq_client,
+            system_prompt,
+            "Generate {count} structured facility reports for: {scenario}",
+            scenario_prompt,
+            RESOURCE_SCHEMA,
+            cancel=cancel
         )
-        resources = json.loads(response.choices[0].message.content)
-        return pd.DataFrame(resources)
     except Exception as e:
-        st.error(f"Error generating resource data: {str(e)}")
+        # Once cancelled, the page has moved on; don't write into a later rerun
+        if cancel is None or not cancel.is_set():
+            st.error(f"Error generating resource data: {str(e)}")
         return pd.DataFrame()
 
-def generate_social_updates(groq_client, scenario_prompt):
+def generate_social_updates(groq_client, scenario_prompt, cancel=None):
     """Generate structured social media updates"""
-    messages = [
-        {"role": "system", "content": """You are a social media feed generator for Qatar's emergency management system. 
-        Generate exactly 10 social updates as a JSON array with this exact structure for each update:
+    system_prompt = """You are a social media feed generator for Qatar's emergency management system. 
+        Generate the requested number of social updates as a JSON array with this exact structure for each update:
         {
             "source_type": "one of [Official, Healthcare, Emergency, Media, Citizen]",
             "username": "Twitter handle with @",
@@ -110,61 +189,118 @@ def generate_social_updates(groq_client, scenario_prompt):
             "trust_score": "0.0 to 1.0",
             "timestamp": "current time in YYYY-MM-DD HH:MM format",
             "engagement": "100 to 5000"
-        }"""},
-        {"role": "user", "content": f"Generate 10 structured social updates for: {scenario_prompt}"}
-    ]
-    
+        }"""
+
     try:
-        response = groq_client.chat.completions.create(
-            messages=messages,
-            model="mixtral-8x7b-32768",
-            temperature=0.7,
-            max_tokens=1000
+        return stream_records(
+            groq_client,
+            system_prompt,
+            "Generate {count} structured social updates for: {scenario}",
+            scenario_prompt,
+            UPDATE_SCHEMA,
+            cancel=cancel
         )
-        updates = json.loads(response.choices[0].message.content)
-        return pd.DataFrame(updates)
     except Exception as e:
-        st.error(f"Error generating social updates: {str(e)}")
+        # Once cancelled, the page has moved on; don't write into a later rerun
+        if cancel is None or not cancel.is_set():
+            st.error(f"Error generating social updates: {str(e)}")
         return pd.DataFrame()
 
+@st.cache_resource
+def get_data_store():
+    # Same file main.py reads from, so every public session sees new scenarios
+    return SharedDataStore()
+
+# (session_state key, label, generator, timeout in seconds)
+SCENARIO_TASKS = [
+    ('disasters', 'Disaster alerts', generate_disaster_data, 90),
+    ('resources', 'Resource data', generate_resource_data, 90),
+    ('updates', 'Social updates', generate_social_updates, 90),
+]
+
 def process_scenario(prompt, groq_client):
-    """Process scenario and generate all data"""
+    """Process scenario and generate all data, running the generators concurrently"""
     try:
-        st.session_state.disasters = pd.DataFrame()
-        st.session_state.resources = pd.DataFrame()
-        st.session_state.updates = pd.DataFrame()
+        for key, _, _, _ in SCENARIO_TASKS:
+            st.session_state[key] = pd.DataFrame()
+
+        ctx = get_script_run_ctx()
+
+        def run(generator, cancel):
+            # Let st.error calls inside the generators reach this session
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return generator(groq_client, prompt, cancel=cancel)
 
-        with st.spinner("Generating disaster alerts..."):
-            disasters_df = generate_disaster_data(groq_client, prompt)
-            if not disasters_df.empty:
-                st.session_state.disasters = disasters_df
-                st.success("✅ Disaster alerts generated!")
-        
-        with st.spinner("Generating resource data..."):
-            resources_df = generate_resource_data(groq_client, prompt)
-            if not resources_df.empty:
-                st.session_state.resources = resources_df
-                st.success("✅ Resource data generated!")
-        
-        with st.spinner("Generating social updates..."):
-            updates_df = generate_social_updates(groq_client, prompt)
-            if not updates_df.empty:
-                st.session_state.updates = updates_df
-                st.success("✅ Social updates generated!")
-        
-        return True
+        progress = st.progress(0.0, text="Generating scenario data...")
+        executor = ThreadPoolExecutor(max_workers=len(SCENARIO_TASKS))
+        started = time.monotonic()
+        # future.cancel() can't stop a running worker, so each one also checks its event
+        cancel = {key: threading.Event() for key, _, _, _ in SCENARIO_TASKS}
+        futures = {
+            executor.submit(run, generator, cancel[key]): (key, label, timeout)
+            for key, label, generator, timeout in SCENARIO_TASKS
+        }
+        pending = set(futures)
+        finished = 0
+        failed = 0
+        try:
+            while pending:
+                deadline = min(started + futures[f][2] for f in pending)
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    key, label, _ = futures[future]
+                    try:
+                        result_df = future.result()
+                    except Exception as e:
+                        st.error(f"Error generating {label.lower()}: {str(e)}")
+                        result_df = pd.DataFrame()
+                    requested = result_df.attrs.get('requested')
+                    invalid = result_df.attrs.get('invalid', 0)
+                    # Results land in session state as soon as each call returns
+                    if result_df.empty:
+                        failed += 1
+                        st.error(f"No valid {label.lower()} were generated"
+                                 + (f" ({invalid} invalid records rejected)" if invalid else ""))
+                    else:
+                        if invalid or (requested and len(result_df) < requested):
+                            st.warning(f"{label}: {len(result_df)} of {requested} records generated, "
+                                       f"{invalid} invalid records rejected")
+                        st.session_state[key] = result_df
+                        try:
+                            version = get_data_store().write(key, result_df)
+                            st.success(f"✅ {label} generated! (published as version {version})")
+                        except Exception as e:
+                            st.success(f"✅ {label} generated!")
+                            st.warning(f"Could not publish {label.lower()} to the public app: {str(e)}")
+                    finished += 1
+                    progress.progress(finished / len(futures), text=f"{label} done ({finished}/{len(futures)})")
+
+                now = time.monotonic()
+                for future in [f for f in pending if now >= started + futures[f][2]]:
+                    key, label, timeout = futures[future]
+                    pending.discard(future)
+                    future.cancel()
+                    cancel[key].set()
+                    st.warning(f"⏱️ {label} timed out after {timeout}s")
+                    failed += 1
+                    finished += 1
+                    progress.progress(finished / len(futures), text=f"{label} timed out ({finished}/{len(futures)})")
+        finally:
+            # Don't block the rerun on a request that already timed out, and stop
+            # any worker still going (e.g. when a rerun interrupts this one)
+            for event in cancel.values():
+                event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return failed == 0
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return False
 
-# Initialize session state with empty DataFrames
-if 'disasters' not in st.session_state:
-    st.session_state.disasters = pd.DataFrame()
-if 'resources' not in st.session_state:
-    st.session_state.resources = pd.DataFrame()
-if 'updates' not in st.session_state:
-    st.session_state.updates = pd.DataFrame()
-
 # Export data function for app.py
 def get_simulation_data():
     return {
@@ -173,66 +309,78 @@ def get_simulation_data():
         'updates': st.session_state.updates
     }
 
-# Main interface
-st.markdown("""
-    <div class="title-block">
-        <h1>🐜 ANTNA Admin</h1>
-        <p><span class="status-indicator status-active"></span>Crisis Simulation Control</p>
-    </div>
-""", unsafe_allow_html=True)
+def main():
+    # Initialize session state with empty DataFrames
+    if 'disasters' not in st.session_state:
+        st.session_state.disasters = pd.DataFrame()
+    if 'resources' not in st.session_state:
+        st.session_state.resources = pd.DataFrame()
+    if 'updates' not in st.session_state:
+        st.session_state.updates = pd.DataFrame()
+
+    # Main interface
+    st.markdown("""
+        <div class="title-block">
+            <h1>🐜 ANTNA Admin</h1>
+            <p><span class="status-indicator status-active"></span>Crisis Simulation Control</p>
+        </div>
+    """, unsafe_allow_html=True)
 
-# Create tabs
-tab1, tab2 = st.tabs(["💭 Scenario Generator", "📊 Current Data"])
+    # Create tabs
+    tab1, tab2 = st.tabs(["💭 Scenario Generator", "📊 Current Data"])
 
-# Scenario Generator Tab
-with tab1:
-    st.markdown("<h2>💭 Generate Emergency Scenario</h2>", unsafe_allow_html=True)
-    
-    # Example scenarios
-    examples = {
-        "Sandstorm": "A severe sandstorm is approaching Doha with winds exceeding 80km/h. Visibility is dropping rapidly.",
-        "Heatwave": "A heatwave has hit Qatar with temperatures reaching 50°C, causing widespread power outages.",
-        "Flooding": "Heavy rainfall has caused flash flooding in Al Wakrah, with water levels rising rapidly.",
-        "Multiple": "Multiple dust storms are affecting northern Qatar regions with strong winds."
-    }
+    # Scenario Generator Tab
+    with tab1:
+        st.markdown("<h2>💭 Generate Emergency Scenario</h2>", unsafe_allow_html=True)
     
-    scenario_type = st.selectbox("Select Scenario Type", ["Custom"] + list(examples.keys()))
+        # Example scenarios
+        examples = {
+            "Sandstorm": "A severe sandstorm is approaching Doha with winds exceeding 80km/h. Visibility is dropping rapidly.",
+            "Heatwave": "A heatwave has hit Qatar with temperatures reaching 50°C, causing widespread power outages.",
+            "Flooding": "Heavy rainfall has caused flash flooding in Al Wakrah, with water levels rising rapidly.",
+            "Multiple": "Multiple dust storms are affecting northern Qatar regions with strong winds."
+        }
     
-    if scenario_type == "Custom":
-        prompt = st.text_area(
-            "Describe the emergency scenario",
-            placeholder="Describe the emergency scenario in detail...",
-            height=150
-        )
-    else:
-        prompt = examples[scenario_type]
-        st.text_area("Scenario Description", value=prompt, height=150, disabled=True)
+        scenario_type = st.selectbox("Select Scenario Type", ["Custom"] + list(examples.keys()))
     
-    if st.button("Generate Scenario", type="primary"):
-        if prompt:
-            success = process_scenario(prompt, groq_client)
-            if success:
-                st.balloons()
+        if scenario_type == "Custom":
+            prompt = st.text_area(
+                "Describe the emergency scenario",
+                placeholder="Describe the emergency scenario in detail...",
+                height=150
+            )
         else:
-            st.warning("Please enter a scenario description")
+            prompt = examples[scenario_type]
+            st.text_area("Scenario Description", value=prompt, height=150, disabled=True)
+    
+        if st.button("Generate Scenario", type="primary"):
+            if prompt:
+                success = process_scenario(prompt, groq_client)
+                if success:
+                    st.balloons()
+            else:
+                st.warning("Please enter a scenario description")
 
-# Data Viewer Tab
-with tab2:
-    st.markdown("<h2>📊 Current Simulation Data</h2>", unsafe_allow_html=True)
+    # Data Viewer Tab
+    with tab2:
+        st.markdown("<h2>📊 Current Simulation Data</h2>", unsafe_allow_html=True)
     
-    if not st.session_state.disasters.empty:
-        st.markdown("<h3>🚨 Active Disasters</h3>", unsafe_allow_html=True)
-        st.dataframe(st.session_state.disasters, use_container_width=True)
+        if not st.session_state.disasters.empty:
+            st.markdown("<h3>🚨 Active Disasters</h3>", unsafe_allow_html=True)
+            st.dataframe(st.session_state.disasters, use_container_width=True)
     
-    if not st.session_state.resources.empty:
-        st.markdown("<h3>🏥 Resource Levels</h3>", unsafe_allow_html=True)
-        st.dataframe(st.session_state.resources, use_container_width=True)
+        if not st.session_state.resources.empty:
+            st.markdown("<h3>🏥 Resource Levels</h3>", unsafe_allow_html=True)
+            st.dataframe(st.session_state.resources, use_container_width=True)
     
-    if not st.session_state.updates.empty:
-        st.markdown("<h3>📱 Social Updates</h3>", unsafe_allow_html=True)
-        st.dataframe(st.session_state.updates, use_container_width=True)
+        if not st.session_state.updates.empty:
+            st.markdown("<h3>📱 Social Updates</h3>", unsafe_allow_html=True)
+            st.dataframe(st.session_state.updates, use_container_width=True)
     
-    if (st.session_state.disasters.empty and 
-        st.session_state.resources.empty and 
-        st.session_state.updates.empty):
-        st.info("No simulation data available. Generate a scenario to see data here.")
+        if (st.session_state.disasters.empty and 
+            st.session_state.resources.empty and 
+            st.session_state.updates.empty):
+            st.info("No simulation data available. Generate a scenario to see data here.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Capacity-aware assignment of evacuees to shelters.
+
+Given people per origin, a travel-time matrix and each shelter's free
+places, Allocator finds the assignment with the least total travel time.
+That is a transportation problem, solved with an ε-scaling auction.
+
+Every round, each origin that still has people bids for its best shelter
+(travel time + price). Each shelter keeps its highest bids up to capacity,
+and its price rises to the lowest bid it kept. The rounds are array
+operations over all bidding origins, so thousands of origins by hundreds
+of shelters solve in a few seconds.
+
+Two dummies keep the problem balanced:
+- an "unassigned" shelter that takes anyone left over, at a large cost
+- a spare-places origin that fills any free place at no cost
+
+With the final ε, the total travel time is within ε per person of the
+optimum.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Supplies a shelter needs per extra person, in the units of the resources table
+PER_PERSON_NEEDS = {'water_supply': 1.0, 'food_supply': 1.0}
+
+
+def free_places(facilities, needs=PER_PERSON_NEEDS):
+    """
+    People each facility can still take: free beds (capacity - current),
+    capped by the supplies it holds for newcomers. facilities is a
+    FacilityRegistry frame, or any frame with capacity/current and
+    optionally the resource columns.
+    """
+    free = (facilities['capacity'] - facilities['current']).to_numpy(dtype=np.float64)
+    for column, per_person in (needs or {}).items():
+        if column in facilities and per_person > 0:
+            supplies = facilities[column].to_numpy(dtype=np.float64)
+            # Missing resource rows don't constrain anything
+            free = np.fmin(free, np.where(np.isnan(supplies), np.inf, supplies / per_person))
+    return np.maximum(np.floor(free), 0).astype(np.int64)
+
+
+class Allocator:
+    """Min-total-time assignment of people at origins to shelters with limited places.
+
+    cost is (origins, shelters) travel time in seconds; NaN or inf marks a
+    shelter that can't be reached. supply and capacity are non-negative
+    integers. After solve(), flows[i, j] is the number of people sent from
+    origin i to shelter j, and unassigned[i] counts those who didn't fit.
+    """
+
+    def __init__(self, cost, supply, capacity, epsilon=10.0, unassigned_cost=None):
+        cost = np.asarray(cost, dtype=np.float64)
+        reachable = np.isfinite(cost)
+        self.n_origins, self.n_shelters = cost.shape
+        worst = cost[reachable].max() if reachable.any() else 1.0
+        self.unassigned_cost = 10 * worst + 1 if unassigned_cost is None else unassigned_cost
+        self.epsilon = epsilon
+
+        # Rows: real origins, then the spare-places origin. Columns: shelters, then "unassigned".
+        self._cost = np.zeros((self.n_origins + 1, self.n_shelters + 1))
+        self._cost[:-1, :-1] = np.where(reachable, cost, self.unassigned_cost * 2)
+        self._cost[:-1, -1] = self.unassigned_cost
+        self._prices = np.zeros(self.n_shelters + 1)
+        self._set_sizes(supply, capacity)
+        self._clear_bids()
+        self.rounds = 0
+
+    def _set_sizes(self, supply, capacity):
+        self.supply = np.asarray(supply, dtype=np.int64).copy()
+        self.capacity = np.asarray(capacity, dtype=np.int64).copy()
+        self._supply = np.append(self.supply, self.capacity.sum())
+        self._capacity = np.append(self.capacity, self.supply.sum())
+
+    def _clear_bids(self):
+        # Bids shelters are holding, one row per (shelter, origin)
+        self._bid_shelter = np.empty(0, dtype=np.int64)
+        self._bid_origin = np.empty(0, dtype=np.int64)
+        self._bid_mass = np.empty(0, dtype=np.int64)
+        self._bid_price = np.empty(0)
+
+    def _held(self):
+        return np.bincount(self._bid_origin, weights=self._bid_mass, minlength=len(self._supply)).astype(np.int64)
+
+    def _keep_best(self, shelters=None):
+        """Each shelter keeps its highest bids up to capacity and updates its price; only shelters given, if any"""
+        n_cols = len(self._capacity)
+        rows = slice(None) if shelters is None else np.isin(self._bid_shelter, shelters)
+        rest = None if shelters is None else ~rows
+        origin, shelter = self._bid_origin[rows], self._bid_shelter[rows]
+        # Merge repeat bids from the same origin at the newest (highest) price: the
+        # origin is bidding for all its places there at once
+        pairs, inverse = np.unique(origin * n_cols + shelter, return_inverse=True)
+        mass = np.bincount(inverse, weights=self._bid_mass[rows]).astype(np.int64)
+        price = np.full(len(pairs), -np.inf)
+        np.maximum.at(price, inverse, self._bid_price[rows])
+        origin, shelter = pairs // n_cols, pairs % n_cols
+
+        order = np.lexsort((-price, shelter))
+        origin, shelter, mass, price = origin[order], shelter[order], mass[order], price[order]
+        # Mass ahead of each bid within its shelter
+        cumulative = np.cumsum(mass)
+        starts = np.searchsorted(shelter, shelter, side='left')
+        ahead = cumulative - mass - np.where(starts > 0, cumulative[starts - 1], 0)
+        kept = np.clip(self._capacity[shelter] - ahead, 0, mass)
+        keep = kept > 0
+        origin, shelter, mass, price = origin[keep], shelter[keep], kept[keep], price[keep]
+
+        # A full shelter's price is the lowest bid it kept
+        filled = np.bincount(shelter, weights=mass, minlength=n_cols)
+        lowest = np.full(n_cols, np.inf)
+        np.minimum.at(lowest, shelter, price)
+        full = (filled >= self._capacity) & np.isfinite(lowest)
+        self._prices[full] = np.maximum(self._prices[full], lowest[full])
+
+        if rest is not None:
+            origin = np.concatenate([self._bid_origin[rest], origin])
+            shelter = np.concatenate([self._bid_shelter[rest], shelter])
+            mass = np.concatenate([self._bid_mass[rest], mass])
+            price = np.concatenate([self._bid_price[rest], price])
+        self._bid_origin, self._bid_shelter, self._bid_mass, self._bid_price = origin, shelter, mass, price
+
+    def _auction(self, epsilon, max_rounds):
+        for _ in range(max_rounds):
+            left = self._supply - self._held()
+            bidders = np.flatnonzero(left > 0)
+            if len(bidders) == 0:
+                return True
+            values = np.where(self._capacity > 0, self._cost[bidders] + self._prices, np.inf)
+            two = np.argpartition(values, 1, axis=1)[:, :2]
+            two_values = np.take_along_axis(values, two, axis=1)
+            first = np.argmin(two_values, axis=1)
+            best = two[np.arange(len(bidders)), first]
+            # Bid up to where the second-best shelter would be as good, plus ε
+            gap = np.abs(two_values[:, 1] - two_values[:, 0])
+            bid = self._prices[best] + np.where(np.isfinite(gap), gap, 0) + epsilon
+
+            self._bid_shelter = np.concatenate([self._bid_shelter, best])
+            self._bid_origin = np.concatenate([self._bid_origin, bidders])
+            self._bid_mass = np.concatenate([self._bid_mass, left[bidders]])
+            self._bid_price = np.concatenate([self._bid_price, bid])
+            self._keep_best(np.unique(best))
+            self.rounds += 1
+        return False
+
+    def _release(self, epsilon):
+        """Drop held places that are more than ε worse than the origin's best shelter"""
+        values = np.where(self._capacity > 0, self._cost + self._prices, np.inf)
+        held = values[self._bid_origin, self._bid_shelter]
+        keep = held <= values.min(axis=1)[self._bid_origin] + epsilon
+        self._bid_origin, self._bid_shelter = self._bid_origin[keep], self._bid_shelter[keep]
+        self._bid_mass, self._bid_price = self._bid_mass[keep], self._bid_price[keep]
+
+    def _scale(self, max_rounds):
+        epsilon = max(self._cost.max() / 4, self.epsilon)
+        while True:
+            # Each phase keeps the prices and every place that's still within ε of the best
+            self._release(epsilon)
+            self._auction(epsilon, max_rounds)
+            if epsilon <= self.epsilon:
+                return self
+            # Go straight to the final ε rather than run a phase barely above it
+            epsilon = epsilon / 5 if epsilon / 5 > 2 * self.epsilon else self.epsilon
+
+    def solve(self, max_rounds=100000):
+        """Solve from scratch with ε-scaling; returns self"""
+        self._prices[:] = 0
+        self._clear_bids()
+        self.rounds = 0
+        return self._scale(max_rounds)
+
+    @property
+    def flows(self):
+        """(origins, shelters) people sent from each origin to each shelter"""
+        real = (self._bid_origin < self.n_origins) & (self._bid_shelter < self.n_shelters)
+        flows = np.zeros((self.n_origins, self.n_shelters), dtype=np.int64)
+        np.add.at(flows, (self._bid_origin[real], self._bid_shelter[real]), self._bid_mass[real])
+        return flows
+
+    @property
+    def unassigned(self):
+        return self.supply - self.flows.sum(axis=1)
+
+    @property
+    def total_time(self):
+        """Sum over assigned people of their travel time, in the cost's units"""
+        flows = self.flows
+        return float((flows * np.where(flows > 0, self._cost[:-1, :-1], 0)).sum())
+
+
+class EvacuationPlanner:
+    """One Allocator for fixed origins and shelters, shared by every session.
+
+    plan() solves on the first call and again only when the people per
+    origin or the free places change, so reruns with the same inputs reuse
+    the last assignment.
+    """
+
+    def __init__(self, origin_names, shelter_names, durations, epsilon=10.0):
+        self.origin_names = list(origin_names)
+        self.shelter_names = list(shelter_names)
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.epsilon = epsilon
+        self.allocator = None
+        self._lock = threading.Lock()
+
+    def plan(self, people, free):
+        """
+        (assignments, unassigned): a frame of origin, shelter, people and
+        drive minutes, one row per route used, and people per origin that
+        didn't fit anywhere.
+        """
+        people = np.asarray(people, dtype=np.int64)
+        free = np.asarray(free, dtype=np.int64)
+        with self._lock:
+            if self.allocator is None or not (np.array_equal(people, self.allocator.supply)
+                                              and np.array_equal(free, self.allocator.capacity)):
+                self.allocator = Allocator(self.durations, people, free, self.epsilon).solve()
+            flows, unassigned = self.allocator.flows, self.allocator.unassigned
+        rows, cols = np.nonzero(flows)
+        assignments = pd.DataFrame({
+            'origin': [self.origin_names[i] for i in rows],
+            'shelter': [self.shelter_names[j] for j in cols],
+            'people': flows[rows, cols],
+            'drive_min': self.durations[rows, cols] / 60,
+        })
+        return assignments, pd.Series(unassigned, index=self.origin_names, name='unassigned')
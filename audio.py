@@ -0,0 +1,219 @@
+"""
+In-memory voice pipeline: WAV bytes -> 16 kHz mono -> silence trimmed -> compact upload.
+
+Nothing touches the filesystem. Recordings are decoded with the standard
+library's wave module, downmixed and resampled with numpy, and trimmed to
+the span that has speech in it. They are encoded as FLAC when soundfile is
+installed and as 16-bit WAV otherwise. Whisper works at 16 kHz mono
+internally, so nothing it uses is lost. Long recordings are cut at quiet
+points into bounded chunks that are transcribed concurrently.
+"""
+import hashlib
+import io
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from cache import TieredCache
+
+TARGET_RATE = 16000
+
+
+def decode_wav(data):
+    """(samples, rate) from PCM WAV bytes; samples is float32 (n, channels) in [-1, 1]"""
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        # 24-bit: widen each sample to int32 by putting it in the top three bytes
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view('<i4').ravel().astype(np.float32) / 2 ** 31
+    else:
+        dtype = {2: '<i2', 4: '<i4'}[width]
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32) / 2 ** (8 * width - 1)
+    return samples.reshape(-1, channels), rate
+
+
+def to_mono_16k(samples, rate):
+    """Average the channels and resample to 16 kHz"""
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    if rate == TARGET_RATE or len(mono) == 0:
+        return mono.astype(np.float32)
+    if rate > TARGET_RATE:
+        # Moving average over one output sample's worth of input as a cheap anti-alias filter
+        width = int(round(rate / TARGET_RATE))
+        if width > 1:
+            mono = np.convolve(mono, np.ones(width, dtype=np.float32) / width, mode='same')
+    n_out = int(len(mono) * TARGET_RATE / rate)
+    positions = np.arange(n_out) * (rate / TARGET_RATE)
+    return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+
+
+def frame_energy_db(samples, rate=TARGET_RATE, frame_ms=30):
+    """(frame length, RMS energy in dB per whole frame)"""
+    frame = max(1, int(rate * frame_ms / 1000))
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    return frame, 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+
+
+def trim_silence(samples, rate=TARGET_RATE, frame_ms=30, pad_ms=200, floor_db=-50.0, margin_db=12.0,
+                 speech_db=-35.0):
+    """
+    Cut leading and trailing silence with an energy VAD. A frame is speech
+    when its RMS is margin_db above the recording's noise floor (its 10th
+    percentile frame) and above floor_db. A clip with no quiet stretch to
+    measure the floor on (speech end to end) falls back to frames louder
+    than speech_db. pad_ms is kept on each side so word onsets aren't
+    clipped. Returns an empty array if nothing is voiced.
+    """
+    frame, energy_db = frame_energy_db(samples, rate, frame_ms)
+    if len(energy_db) == 0:
+        return samples[:0]
+    threshold = max(floor_db, np.percentile(energy_db, 10) + margin_db)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if len(voiced) == 0:
+        voiced = np.flatnonzero(energy_db > speech_db)
+    if len(voiced) == 0:
+        return samples[:0]
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def split_at_silence(samples, rate=TARGET_RATE, max_seconds=20.0, min_seconds=5.0, frame_ms=30):
+    """
+    [(start, end)] sample ranges covering the recording, each at most
+    max_seconds long. Each cut goes at the quietest frame between
+    min_seconds and max_seconds into the current chunk, so words aren't
+    split unless someone talks for max_seconds without a pause.
+    """
+    if len(samples) <= max_seconds * rate:
+        return [(0, len(samples))]
+    frame, energy_db = frame_energy_db(samples, rate, frame_ms)
+    max_frames = int(max_seconds * rate / frame)
+    min_frames = min(int(min_seconds * rate / frame), max_frames // 2)
+    cuts = [0]
+    start = 0
+    while len(samples) - cuts[-1] > max_seconds * rate:
+        # Cut in the middle of the quietest frame in the allowed window
+        cut = start + min_frames + int(np.argmin(energy_db[start + min_frames:start + max_frames]))
+        cuts.append(cut * frame + frame // 2)
+        start = cut
+    cuts.append(len(samples))
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def encode(samples, rate=TARGET_RATE, codec='flac'):
+    """(bytes, filename) for upload; FLAC needs soundfile and falls back to WAV without it"""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    if codec == 'flac':
+        try:
+            import soundfile
+        except ImportError:
+            codec = 'wav'
+        else:
+            buffer = io.BytesIO()
+            soundfile.write(buffer, pcm, rate, format='FLAC', subtype='PCM_16')
+            return buffer.getvalue(), 'audio.flac'
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue(), 'audio.wav'
+
+
+def prepare_audio(audio_bytes, codec='flac', max_chunk_seconds=None):
+    """
+    Recording -> (uploads, stats), where uploads is a list of
+    (payload, filename) in order, or None when there is no speech. With
+    max_chunk_seconds, the speech is split at quiet points into chunks of at
+    most that length. Audio that can't be decoded is passed through whole.
+    """
+    try:
+        samples, rate = decode_wav(audio_bytes)
+    except (wave.Error, EOFError, KeyError, ValueError):
+        return [(audio_bytes, 'audio.wav')], {'input_bytes': len(audio_bytes), 'upload_bytes': len(audio_bytes)}
+    speech = trim_silence(to_mono_16k(samples, rate))
+    if len(speech) == 0:
+        return None
+    bounds = split_at_silence(speech, max_seconds=max_chunk_seconds) if max_chunk_seconds else [(0, len(speech))]
+    uploads = [encode(speech[start:end], TARGET_RATE, codec) for start, end in bounds]
+    return uploads, {
+        'input_bytes': len(audio_bytes),
+        'upload_bytes': sum(len(payload) for payload, _ in uploads),
+        'input_seconds': len(samples) / rate,
+        'speech_seconds': len(speech) / TARGET_RATE,
+        'chunks': len(uploads),
+    }
+
+
+def stitch(texts):
+    """Chunk transcripts in order; chunks still running show as an ellipsis"""
+    parts = [text.strip() if text is not None else "…" for text in texts]
+    return " ".join(part for part in parts if part)
+
+
+class TranscriptCache(TieredCache):
+    """Transcripts keyed by a hash of the raw recording, so a repeated clip skips the upload"""
+
+    def __init__(self, path=None, memory_size=256, ttl_seconds=24 * 3600, max_disk_entries=2000):
+        super().__init__(path, memory_size, ttl_seconds, max_disk_entries, table='transcripts')
+
+    def make_key(self, audio_bytes, model):
+        return hashlib.sha256(model.encode() + b'\0' + audio_bytes).hexdigest()
+
+    def transcribe_chunks(self, client, audio_bytes, model="whisper-large-v3", codec='flac',
+                          max_chunk_seconds=20.0, max_workers=4):
+        """
+        Yield (text so far, stats) each time a chunk's transcript arrives,
+        with chunks transcribed concurrently and stitched back in order. The
+        last yield has the full text, which is cached unless it's empty. A
+        cache hit or a silent clip yields once.
+        """
+        key = self.make_key(audio_bytes, model)
+        text = self.get(key)
+        if text is not None:
+            yield text, {'cached': True, 'chunks': 1, 'done': 1}
+            return
+
+        prepared = prepare_audio(audio_bytes, codec, max_chunk_seconds)
+        if prepared is None:
+            yield "", {'cached': False, 'speech_seconds': 0.0, 'chunks': 0, 'done': 0}
+            return
+        uploads, stats = prepared
+        texts = [None] * len(uploads)
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(uploads))))
+        try:
+            futures = {
+                executor.submit(client.audio.transcriptions.create, file=(filename, payload), model=model): i
+                for i, (payload, filename) in enumerate(uploads)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                texts[futures[future]] = future.result().text
+                yield stitch(texts), dict(stats, cached=False, done=done)
+        finally:
+            # A rerun can close the generator early; don't wait on chunks nobody will read
+            executor.shutdown(wait=False, cancel_futures=True)
+        text = stitch(texts)
+        # An empty transcript may be a bad take or a trimming miss; let a retry reach the API
+        if text:
+            self.put(key, text)
+
+    def transcribe(self, client, audio_bytes, model="whisper-large-v3", codec='flac', max_chunk_seconds=None):
+        """
+        (text, stats) for a recording, calling the API only on a miss. text
+        is "" when the clip has no speech in it.
+        """
+        text, stats = "", {}
+        for text, stats in self.transcribe_chunks(client, audio_bytes, model, codec, max_chunk_seconds):
+            pass
+        return text, stats
@@ -0,0 +1,312 @@
+"""
+Offline benchmarks for the hot paths in main.py and admin.py.
+
+Groq and OpenRouteService are swapped for the stand-ins in fakes.py (with
+configurable latency) and the app runs on synthetic data at each requested
+size. Results are written as JSON so two runs can be compared:
+
+    python benchmark.py --sizes 100 1000 10000 --groq-latency 0.3 --out benchmarks/results.json
+    python benchmark.py --compare benchmarks/before.json benchmarks/after.json
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import synthetic_data
+from facilities import FacilityRegistry
+from update_store import UpdateStore
+from ingest import LiveFeed
+from trust import TrustScorer
+from spatial import ImpactIndex
+from travel_matrix import HaversineProvider
+from allocation import Allocator, free_places
+from forecast import DepletionForecast, SCENARIOS
+from audio import TranscriptCache, prepare_audio
+from fakes import FakeGroq, StubORSClient, StubTranscriber, app_reply, fake_recording
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+QUERIES = ["Is there a sandstorm warning near Al Wakrah?",
+           "Which roads are flooded in Doha?",
+           "Where can I get medical supplies?"]
+SCENARIO = "A severe sandstorm is approaching Doha with winds exceeding 80km/h."
+
+
+def memoize(func):
+    """
+    Process-wide stand-in for st.cache_resource / st.cache_data. Hashable
+    arguments are keyed by value, others (DataFrames) by identity; the
+    arguments are kept alive so an id can't be reused by a new object.
+    """
+    results = {}
+
+    def key_of(value):
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return ('id', id(value))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (tuple(key_of(a) for a in args), tuple((k, key_of(v)) for k, v in sorted(kwargs.items())))
+        if key not in results:
+            results[key] = (args, kwargs, func(*args, **kwargs))
+        return results[key][2]
+
+    wrapper.clear = results.clear
+    return wrapper
+
+
+def load_apps(groq_client, ors_client):
+    """
+    Import main.py and admin.py outside `streamlit run` with the fake clients
+    wired in. Streamlit's caches only hold values during a script run, so
+    every cached getter is swapped for memoize() and warm calls reuse the
+    same indexes, caches and travel-time matrix like they would in the app.
+    """
+    warnings.filterwarnings('ignore')
+    # Both scripts read styles.css relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(REPO_DIR)
+    try:
+        import main
+        import admin
+    finally:
+        os.chdir(cwd)
+    main.groq_client = groq_client
+    main.ors_client = ors_client
+    for module in (main, admin):
+        for name, value in list(vars(module).items()):
+            # Functions decorated with st.cache_resource / st.cache_data
+            if callable(value) and hasattr(value, '__wrapped__') and hasattr(value, 'clear'):
+                setattr(module, name, memoize(value.__wrapped__))
+    return main, admin
+
+
+def measure(fn, repeat):
+    """Time one cold call (cache builds, API misses) and `repeat` warm calls, in ms"""
+    start = time.perf_counter()
+    fn()
+    first_ms = (time.perf_counter() - start) * 1000
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        'first_ms': first_ms,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'mean_ms': statistics.fmean(times),
+        'repeat': repeat,
+    }
+
+
+def consume(response):
+    # Streaming answers are generators; time them to the last chunk
+    return response if isinstance(response, str) else "".join(response)
+
+
+def size_cases(main, size, updates_per_facility, map_limit, lookups, seed):
+    """(case, n, fn) for everything that scales with the dataset"""
+    alerts_df, shelters_df, resources_df, social_updates_df = synthetic_data.generate_dataset(
+        n_facilities=size, n_updates=size * updates_per_facility, n_alerts=10, seed=seed)
+    user_location = main.doha_locations["Doha City Center"]
+    account_types = social_updates_df['account_type'].unique()
+    names = shelters_df['name'].sample(min(lookups, size), random_state=seed).tolist()
+    registry = FacilityRegistry(shelters_df, resources_df)
+    update_store = UpdateStore(social_updates_df)
+    impact = ImpactIndex(alerts_df, registry.frame, social_updates_df)
+    since = update_store.frame.index[-1] - timedelta(minutes=30)
+    map_df = registry.frame.head(map_limit)
+    n_updates = len(social_updates_df)
+    # Evacuation: up to thousands of origins around the facilities, to the first few hundred of them
+    rng = np.random.default_rng(seed)
+    shelters = registry.frame.head(300)
+    lat, lon = shelters['lat'].to_numpy(), shelters['lon'].to_numpy()
+    origins = np.column_stack([rng.uniform(lat.min(), lat.max(), min(10 * size, 3000)),
+                               rng.uniform(lon.min(), lon.max(), min(10 * size, 3000))])
+    drive_times, _ = HaversineProvider()(origins, np.column_stack([lat, lon]))
+    free = free_places(shelters)
+    people = rng.integers(0, 2 * free.sum() // len(origins) + 1, len(origins))
+
+    def uncached_query():
+        # A filter combination nobody has asked for yet
+        update_store._cache.clear()
+        return update_store.query(0.7, account_types)
+
+    def ingest():
+        # Fresh buffer each run: validation, dedup, ring append and index update
+        feed = LiveFeed(capacity=n_updates)
+        feed.ingest_frame(social_updates_df)
+        return feed
+
+    def build_map(clustered):
+        m = main.build_facility_map(map_df, user_location, clustered=clustered)
+        return m.get_root().render()
+
+    return [
+        ('Allocator.solve', drive_times.size, lambda: Allocator(drive_times, people, free).solve()),
+        ('main.find_nearest_shelter', size,
+         lambda: main.find_nearest_shelter(shelters_df, user_location)),
+        ('FacilityRegistry.build', size, lambda: FacilityRegistry(shelters_df, resources_df)),
+        ('FacilityRegistry.get', len(names), lambda: [registry.get(name) for name in names]),
+        ('main.build_facility_map', len(map_df), lambda: build_map(True)),
+        ('main.build_facility_map[markers]', len(map_df), lambda: build_map(False)),
+        ('UpdateStore.build', n_updates, lambda: UpdateStore(social_updates_df)),
+        ('UpdateStore.query', n_updates, lambda: update_store.query(0.7, account_types)),
+        ('UpdateStore.query[uncached]', n_updates, uncached_query),
+        ('UpdateStore.query[last 30 min]', n_updates,
+         lambda: update_store.query(0.7, account_types, since=since)),
+        ('TrustScorer.score_frame', n_updates, lambda: TrustScorer().score_frame(social_updates_df)),
+        ('LiveFeed.ingest_frame', n_updates, ingest),
+        ('DepletionForecast.build', size * len(SCENARIOS), lambda: DepletionForecast(registry.frame)),
+        ('ImpactIndex.build', size, lambda: ImpactIndex(alerts_df, registry.frame, social_updates_df)),
+        ('ImpactIndex.facilities_near_alerts', size, lambda: impact.facilities_near_alerts(10)),
+        ('ImpactIndex.updates_near', n_updates,
+         lambda: impact.updates_near(user_location[0], user_location[1], 5, limit=25)),
+        ('main.retrieve_context[keyword]', n_updates,
+         lambda: [main.retrieve_context(q, social_updates_df, mode="keyword") for q in QUERIES]),
+        ('main.retrieve_context[semantic]', n_updates,
+         lambda: [main.retrieve_context(q, social_updates_df, mode="semantic") for q in QUERIES]),
+        ('main.process_query_with_rag', n_updates,
+         lambda: [consume(main.process_query_with_rag(q, social_updates_df)) for q in QUERIES]),
+        ('main.process_query_with_rag[stream]', n_updates,
+         lambda: [consume(main.process_query_with_rag(q, social_updates_df, stream=True)) for q in QUERIES]),
+        ('main.process_query_with_rag_and_map', size,
+         lambda: consume(main.process_query_with_rag_and_map(QUERIES[2], social_updates_df, shelters_df))),
+    ]
+
+
+def fixed_cases(main, admin, groq_client):
+    """(case, n, fn) for paths that don't depend on the dataset size"""
+    audio = fake_recording()
+    report = fake_recording(speech_seconds=60)
+    # Upload time grows with the clip, so chunking has something to win
+    transcriber = StubTranscriber(latency_s=groq_client.latency_s, seconds_per_audio_second=0.05)
+
+    def transcribe(chunk_seconds):
+        # Fresh cache so every run uploads
+        return TranscriptCache().transcribe(transcriber, report, max_chunk_seconds=chunk_seconds)
+
+    return [
+        ('audio.prepare_audio', 1, lambda: prepare_audio(audio)),
+        ('main.process_voice_input', 1, lambda: main.process_voice_input(audio)),
+        ('TranscriptCache.transcribe[60 s]', 1, lambda: transcribe(None)),
+        ('TranscriptCache.transcribe[60 s, chunked]', 1, lambda: transcribe(20.0)),
+        ('admin.generate_disaster_data', 10, lambda: admin.generate_disaster_data(groq_client, SCENARIO)),
+        ('admin.generate_resource_data', 10, lambda: admin.generate_resource_data(groq_client, SCENARIO)),
+        ('admin.generate_social_updates', 10, lambda: admin.generate_social_updates(groq_client, SCENARIO)),
+        ('admin.process_scenario', 30, lambda: admin.process_scenario(SCENARIO, groq_client)),
+    ]
+
+
+def run(sizes, repeat=5, groq_latency=0.0, chunk_latency=0.0, ors_latency=0.0,
+        updates_per_facility=10, map_limit=2000, lookups=200, seed=0, log=print):
+    # Admin generator requests get JSON records, everything else a canned answer
+    groq_client = FakeGroq(reply=app_reply, latency_s=groq_latency, chunk_latency_s=chunk_latency)
+    ors_client = StubORSClient(latency_s=ors_latency)
+    main, admin = load_apps(groq_client, ors_client)
+
+    results = []
+
+    def record(case, size, n, fn):
+        result = {'case': case, 'size': size, 'n': n, **measure(fn, repeat)}
+        results.append(result)
+        log(f"{case:<40} size={size!s:<8} n={n:<9} first={result['first_ms']:9.1f} ms  "
+            f"median={result['median_ms']:9.1f} ms")
+
+    for case, n, fn in fixed_cases(main, admin, groq_client):
+        record(case, None, n, fn)
+    for size in sizes:
+        for case, n, fn in size_cases(main, size, updates_per_facility, map_limit, lookups, seed):
+            record(case, size, n, fn)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'sizes': sizes,
+            'repeat': repeat,
+            'groq_latency_s': groq_latency,
+            'chunk_latency_s': chunk_latency,
+            'ors_latency_s': ors_latency,
+            'updates_per_facility': updates_per_facility,
+            'map_limit': map_limit,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(before_path, after_path, threshold=1.2, metric='median_ms'):
+    """Print after/before ratios per case and size; returns the regressed cases"""
+    with open(before_path) as f:
+        before = {(r['case'], r['size']): r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {(r['case'], r['size']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for key in sorted(before.keys() & after.keys(), key=lambda k: (k[0], k[1] or 0)):
+        old, new = before[key][metric], after[key][metric]
+        ratio = new / old if old else float('inf')
+        flag = "REGRESSED" if ratio > threshold else ""
+        print(f"{key[0]:<40} size={key[1]!s:<8} {old:9.1f} -> {new:9.1f} ms  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(key)
+    for key in sorted(before.keys() ^ after.keys(), key=lambda k: (k[0], k[1] or 0)):
+        print(f"{key[0]:<40} size={key[1]!s:<8} only in {'before' if key in before else 'after'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANTNA hot paths offline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="facility counts; the feed gets --updates-per-facility times as many updates")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--groq-latency', type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument('--chunk-latency', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--ors-latency', type=float, default=0.0)
+    parser.add_argument('--updates-per-facility', type=int, default=10)
+    parser.add_argument('--map-limit', type=int, default=2000, help="most facilities drawn on the map case")
+    parser.add_argument('--lookups', type=int, default=200, help="resource lookups per repetition")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join('benchmarks', 'results.json'))
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="compare two result files instead of running")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    out = os.path.abspath(args.out)
+    # Caches, matrices and the shared store go to a scratch directory, not the app's .cache
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        report = run(args.sizes, args.repeat, args.groq_latency, args.chunk_latency, args.ors_latency,
+                     args.updates_per_facility, args.map_limit, args.lookups, args.seed)
+        os.chdir(REPO_DIR)
+
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {out}")
+
+
+if __name__ == '__main__':
+    main()
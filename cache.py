@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional SQLite table, both with a TTL.
+
+    Values must be JSON-serialisable. The SQLite tier is bounded to
+    max_disk_entries rows, evicting the least recently used, and can be
+    shared by several processes on the same host.
+    """
+
+    def __init__(self, path=None, memory_size=256, ttl_seconds=24 * 3600,
+                 max_disk_entries=10000, table='entries'):
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.table = table
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if time.time() - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = json.loads(row[0]), row[1]
+                    if time.time() - created <= self.ttl_seconds:
+                        self._db.execute(
+                            f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (time.time(), key)
+                        )
+                        self._db.commit()
+                        self._remember(key, created, value)
+                        self.hits_disk += 1
+                        return value
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                # Drop expired rows, then the least recently used ones over the bound
+                self._db.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl_seconds,))
+                self._db.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+                self._db.commit()
+
+    def _remember(self, key, created, value):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            'hits_memory': self.hits_memory,
+            'hits_disk': self.hits_disk,
+            'misses': self.misses,
+            'hit_rate': (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
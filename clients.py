@@ -0,0 +1,97 @@
+"""
+Process-wide Groq and ORS clients: built on first use, then reused.
+
+Streamlit re-runs the page script on every interaction, so clients built at
+module level meant a new connection pool (and TLS handshake) per rerun.
+A ClientPool is meant to be held in st.cache_resource. Each client is built
+lazily behind a small proxy, with keep-alive pools, timeouts and retries
+with backoff. ANTNA_FAKE_CLIENTS=1, or passing fake factories, swaps in the
+offline fakes.
+"""
+import os
+import threading
+
+from startup import lazy_import
+
+# Groq: seconds to connect / for the whole response; the SDK retries with exponential backoff
+GROQ_TIMEOUT = (5.0, 60.0)
+GROQ_MAX_RETRIES = 2
+# ORS: requests timeout, plus the client's own budget for retrying 429/5xx answers
+ORS_TIMEOUT = 20
+ORS_RETRY_TIMEOUT = 30
+MAX_CONNECTIONS = 20
+
+
+def make_groq_client(api_key, timeout=GROQ_TIMEOUT, max_retries=GROQ_MAX_RETRIES, max_connections=MAX_CONNECTIONS):
+    httpx = lazy_import('httpx')
+    Groq = lazy_import('groq').Groq
+    connect, read = timeout
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(read, connect=connect),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=60.0),
+    )
+    return Groq(api_key=api_key, max_retries=max_retries, http_client=http_client)
+
+
+def make_ors_client(api_key, timeout=ORS_TIMEOUT, retry_timeout=ORS_RETRY_TIMEOUT, max_connections=MAX_CONNECTIONS):
+    openrouteservice = lazy_import('openrouteservice')
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    client = openrouteservice.Client(key=api_key, timeout=timeout, retry_timeout=retry_timeout)
+    # The client retries rate limits and 5xx itself; this adds connection reuse across
+    # threads and backoff on dropped connections, which it doesn't cover
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections,
+                          max_retries=Retry(connect=3, read=0, status=0, backoff_factor=0.5))
+    client._session.mount('https://', adapter)
+    return client
+
+
+def make_fake_groq():
+    from fakes import FakeGroq, app_reply
+    return FakeGroq(reply=app_reply)
+
+
+def make_fake_ors():
+    from fakes import StubORSClient
+    return StubORSClient()
+
+
+class LazyClient:
+    """Builds the real client on first attribute access, once, even with concurrent callers"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+class ClientPool:
+    """The app's API clients, one of each per process.
+
+    groq and ors are LazyClient proxies, so they can be passed anywhere a
+    client is expected. Nothing connects until the first request.
+    """
+
+    def __init__(self, groq_api_key=None, ors_api_key=None, groq_factory=None, ors_factory=None, fake=None):
+        fake = os.environ.get('ANTNA_FAKE_CLIENTS') == '1' if fake is None else fake
+        if groq_factory is None:
+            groq_factory = make_fake_groq if fake else (lambda: make_groq_client(groq_api_key))
+        if ors_factory is None:
+            ors_factory = make_fake_ors if fake else (lambda: make_ors_client(ors_api_key))
+        self.groq = LazyClient(groq_factory)
+        self.ors = LazyClient(ors_factory)
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import re
+
+from cache import TieredCache
+
+
+def normalize_query(query):
+    """Case, whitespace and trailing punctuation should not split cache entries"""
+    return re.sub(r'\s+', ' ', str(query)).strip().lower().rstrip('?!. ')
+
+
+class CompletionCache(TieredCache):
+    """Cache of chat completion text shared by every session.
+
+    Entries are keyed on the normalised query, the model and sampling
+    parameters, and a hash of the retrieved context, so an answer is only
+    reused while the social updates it was grounded on are unchanged.
+    """
+
+    def __init__(self, path=None, memory_size=512, ttl_seconds=10 * 60, max_disk_entries=5000):
+        super().__init__(path, memory_size, ttl_seconds, max_disk_entries, table='completions')
+
+    def make_key(self, query, context, **params):
+        context_hash = hashlib.sha256(context.encode()).hexdigest()
+        payload = json.dumps([normalize_query(query), context_hash, params], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def complete(self, client, messages, query, context, **params):
+        """
+        Return the completion text for messages, calling
+        client.chat.completions.create only on a miss.
+        """
+        key = self.make_key(query, context, **params)
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        response = client.chat.completions.create(messages=messages, **params)
+        text = response.choices[0].message.content
+        self.put(key, text)
+        return text
+
+    def stream(self, client, messages, query, context, **params):
+        """
+        Yield the completion text in pieces as it is generated. A hit yields
+        the cached answer in one piece; a miss is stored only when the stream
+        runs to the end, so an interrupted answer is never cached.
+        """
+        key = self.make_key(query, context, **params)
+        text = self.get(key)
+        if text is not None:
+            yield text
+            return
+
+        response = client.chat.completions.create(messages=messages, stream=True, **params)
+        parts = []
+        try:
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Closing the generator early (new query, rerun) drops the HTTP stream
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+        self.put(key, "".join(parts))
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.environ.get('ANTNA_DATA_STORE', os.path.join('.cache', 'antna_store.sqlite'))
+
+
+class SharedDataStore:
+    """Versioned tables in one SQLite file, written by admin.py and read by every main.py session.
+
+    Each write stores the frame under a fresh table name and then points the
+    `tables` row at it in the same transaction, so readers never see a half
+    replaced table. A global change counter gives every write a new version.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tables ("
+            "name TEXT PRIMARY KEY, version INTEGER, storage TEXT, dtypes TEXT, rows INTEGER)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS counter (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO counter (id, value) VALUES (0, 0)")
+
+    def versions(self):
+        """{table: version} for every stored table; one small query per call"""
+        with self._lock:
+            return dict(self._db.execute("SELECT name, version FROM tables").fetchall())
+
+    def write(self, name, df):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE counter SET value = value + 1")
+                version = self._db.execute("SELECT value FROM counter").fetchone()[0]
+                storage = f"data_{name}_{version}"
+                # Plain executemany rather than to_sql, which commits mid-transaction
+                columns = ", ".join(f'"{column}"' for column in df.columns)
+                self._db.execute(f'CREATE TABLE "{storage}" ({columns})')
+                self._db.executemany(
+                    f'INSERT INTO "{storage}" VALUES ({", ".join("?" * len(df.columns))})',
+                    _sql_rows(df)
+                )
+                old = self._db.execute("SELECT storage FROM tables WHERE name = ?", (name,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tables (name, version, storage, dtypes, rows) VALUES (?, ?, ?, ?, ?)",
+                    (name, version, storage, json.dumps({c: str(t) for c, t in df.dtypes.items()}), len(df))
+                )
+                if old is not None:
+                    self._db.execute(f'DROP TABLE IF EXISTS "{old[0]}"')
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return version
+
+    def read(self, name):
+        """Return (version, DataFrame) for a table, or (None, None) if it was never written"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                row = self._db.execute(
+                    "SELECT version, storage, dtypes FROM tables WHERE name = ?", (name,)
+                ).fetchone()
+                if row is None:
+                    return None, None
+                version, storage, dtypes = row
+                df = pd.read_sql_query(f'SELECT * FROM "{storage}"', self._db)
+            finally:
+                self._db.execute("COMMIT")
+        return version, _restore_dtypes(df, json.loads(dtypes))
+
+
+def _sql_rows(df):
+    out = df.copy()
+    for column in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[column]):
+            out[column] = out[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    out = out.astype(object)
+    return out.where(out.notna(), None).itertuples(index=False, name=None)
+
+
+def _restore_dtypes(df, dtypes):
+    # SQLite keeps text/integer/real only; put the writer's dtypes back
+    for column, dtype in dtypes.items():
+        if column not in df:
+            continue
+        if dtype.startswith('datetime64'):
+            df[column] = pd.to_datetime(df[column])
+        elif dtype == 'bool':
+            df[column] = df[column].astype(bool)
+        elif dtype != 'object':
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+class StoreReader:
+    """Per-process view of a SharedDataStore that reloads only the tables whose version changed"""
+
+    def __init__(self, store):
+        self.store = store
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def snapshot(self, names=None, versions=None):
+        """
+        Return ({table: version}, {table: DataFrame}) with unchanged tables
+        served from memory. Given versions ({table: version}), exactly those
+        are returned, and LookupError is raised if one has been replaced in
+        the store since (only the latest version of a table is kept).
+        """
+        exact = versions is not None
+        if not exact:
+            versions = self.store.versions()
+            if names is not None:
+                versions = {name: v for name, v in versions.items() if name in names}
+        versions = dict(versions)
+        with self._lock:
+            for name, version in versions.items():
+                cached = self._tables.get(name)
+                if cached is None or cached[0] != version:
+                    loaded = self.store.read(name)
+                    if loaded[0] != version:
+                        if exact:
+                            raise LookupError(f"{name} version {version} was replaced by {loaded[0]}")
+                        # Written again since versions() was read
+                        versions[name] = loaded[0]
+                    self._tables[name] = loaded
+                    self.reloads += 1
+            return versions, {name: self._tables[name][1] for name in versions}
+
+
+def alerts_from_disasters(disasters_df):
+    """Admin disaster records -> the alerts_df schema used by main.py"""
+    alerts_df = disasters_df[['type', 'severity', 'location', 'time', 'description']].astype(
+        {'type': str, 'severity': str, 'location': str, 'description': str})
+    alerts_df['time'] = pd.to_datetime(alerts_df['time']).dt.strftime('%Y-%m-%d %H:%M')
+    return alerts_df.reset_index(drop=True)
+
+
+def social_updates_from_updates(updates_df):
+    """Admin social updates -> the social_updates_df schema used by main.py"""
+    social_updates_df = pd.DataFrame({
+        'timestamp': pd.to_datetime(updates_df['timestamp']).dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': 'Twitter',
+        'account_type': updates_df['source_type'].astype(str),
+        'username': updates_df['username'].astype(str),
+        'message': updates_df['message'].astype(str),
+        'location': updates_df['location'].astype(str),
+        'trust_score': updates_df['trust_score'].astype(float),
+        'verified': updates_df['verified'].astype(bool),
+        'engagement': updates_df['engagement'].astype(int),
+        'emergency_type': 'Multiple',
+    })
+    return social_updates_df.reset_index(drop=True)
+
+
+def apply_resource_reports(shelters_df, resources_df, reports_df):
+    """
+    Overlay admin facility reports onto the shelters/resources frames. Only
+    facilities whose name matches a shelter are applied, since reports carry
+    no coordinates; returns new frames and leaves the inputs untouched.
+    """
+    reports = reports_df.assign(facility=reports_df['facility'].astype(str))
+    reports = reports.drop_duplicates('facility', keep='last').set_index('facility')
+    shelters_df = shelters_df.copy()
+    resources_df = resources_df.copy()
+
+    matched = shelters_df['name'].isin(reports.index)
+    names = shelters_df.loc[matched, 'name']
+    shelters_df.loc[matched, 'current'] = reports.loc[names, 'current_occupancy'].to_numpy()
+
+    matched = resources_df['location'].isin(reports.index)
+    names = resources_df.loc[matched, 'location']
+    for report_column, column in [('water', 'water_supply'), ('food', 'food_supply'),
+                                  ('medical', 'medical_kits'), ('beds', 'beds')]:
+        resources_df.loc[matched, column] = reports.loc[names, report_column].to_numpy()
+    resources_df.loc[matched, 'last_updated'] = pd.to_datetime(
+        reports.loc[names, 'last_updated']).dt.strftime('%Y-%m-%d %H:%M').to_numpy()
+    return shelters_df, resources_df
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import zlib
+
+import numpy as np
+
+from retrieval import tokenize
+
+# Small crisis-domain concept map so paraphrases share a feature,
+# e.g. "hospital" and "Hamad Medical" both emit concept:medical
+CONCEPTS = {
+    'medical': ['hospital', 'hospitals', 'medical', 'clinic', 'healthcare', 'health', 'doctor',
+                'doctors', 'ambulance', 'hamad', 'injured', 'injury', 'exhaustion', 'kits', 'first'],
+    'shelter': ['shelter', 'shelters', 'stadium', 'arena', 'evacuation', 'evacuate', 'refuge', 'centre',
+                'center'],
+    'flood': ['flood', 'flooding', 'flash', 'rain', 'rainfall', 'drains', 'water', 'waterlogged'],
+    'heat': ['heat', 'heatwave', 'hot', 'temperature', 'temperatures', 'extreme', 'exhaustion', '48', '47'],
+    'sand': ['sand', 'sandstorm', 'dust', 'visibility', 'storm', 'winds', 'wind'],
+    'traffic': ['traffic', 'road', 'roads', 'diverted', 'closed', 'closure', 'route'],
+    'rescue': ['emergency', 'rescue', 'teams', 'deployed', 'civil', 'defence', 'responders'],
+}
+_CONCEPT_OF = {}
+for _concept, _words in CONCEPTS.items():
+    for _word in _words:
+        _CONCEPT_OF.setdefault(_word, []).append(_concept)
+
+
+class HashingEmbedder:
+    """Offline text embedding: signed feature hashing of words, char trigrams and concepts"""
+
+    def __init__(self, dim=256, trigram_weight=0.5, concept_weight=1.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.concept_weight = concept_weight
+        self._word_cache = {}
+
+    def _word_vector(self, word):
+        """Hashed features of one word as a dense vector, memoised since vocabularies are small"""
+        vector = self._word_cache.get(word)
+        if vector is None:
+            features = [('w:' + word, 1.0)]
+            padded = f'#{word}#'
+            features += [('c:' + padded[i:i + 3], self.trigram_weight) for i in range(len(padded) - 2)]
+            features += [('k:' + concept, self.concept_weight) for concept in _CONCEPT_OF.get(word, ())]
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for name, weight in features:
+                h = zlib.crc32(name.encode())
+                vector[h % self.dim] += weight if h >> 31 else -weight
+            if len(self._word_cache) < 50000:
+                self._word_cache[word] = vector
+        return vector
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 matrix of L2-normalised rows"""
+        token_lists = [tokenize(text) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.intp, count=len(token_lists))
+        out = np.zeros((len(token_lists), self.dim), dtype=np.float32)
+        words = [word for tokens in token_lists for word in tokens]
+        if words:
+            vocab = {word: i for i, word in enumerate(dict.fromkeys(words))}
+            table = np.stack([self._word_vector(word) for word in vocab])
+            token_vectors = table[[vocab[word] for word in words]]
+            # Each text is the sum of its word vectors: one segment sum per batch
+            nonempty = lengths > 0
+            starts = (np.cumsum(lengths) - lengths)[nonempty]
+            out[nonempty] = np.add.reduceat(token_vectors, starts, axis=0)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class EmbeddingStore:
+    """Append-only embedding matrix and filter columns kept in memory-mapped files.
+
+    Vectors are stored as float16 (or float32) rows in vectors.bin, with
+    trust_score, verified, a location code and the caller's document id in
+    sibling files. Search streams the matrix in row chunks, so only one chunk
+    is resident at a time no matter how many updates are stored.
+    """
+
+    def __init__(self, path, dim=256, dtype=np.float16, initial_capacity=1024):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.dim, self.dtype = meta['dim'], np.dtype(meta['dtype'])
+            self.count, self.capacity = meta['count'], meta['capacity']
+            self.locations = meta['locations']
+        else:
+            self.dim, self.dtype = dim, np.dtype(dtype)
+            self.count, self.capacity = 0, initial_capacity
+            self.locations = []
+        self._location_code = {name: i for i, name in enumerate(self.locations)}
+        self._open('r+' if os.path.exists(meta_path) else 'w+')
+
+    def _open(self, mode):
+        def memmap(name, dtype, shape):
+            return np.memmap(os.path.join(self.path, name), dtype=dtype, mode=mode, shape=shape)
+        self.vectors = memmap('vectors.bin', self.dtype, (self.capacity, self.dim))
+        self.trust = memmap('trust.bin', np.float32, (self.capacity,))
+        self.verified = memmap('verified.bin', np.bool_, (self.capacity,))
+        self.location = memmap('location.bin', np.int32, (self.capacity,))
+        self.ids = memmap('ids.bin', np.int64, (self.capacity,))
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.flush()
+        for name, dtype, width in [('vectors.bin', self.dtype, self.dim), ('trust.bin', np.float32, 1),
+                                   ('verified.bin', np.bool_, 1), ('location.bin', np.int32, 1),
+                                   ('ids.bin', np.int64, 1)]:
+            with open(os.path.join(self.path, name), 'r+b') as f:
+                f.truncate(capacity * width * np.dtype(dtype).itemsize)
+        self.capacity = capacity
+        self._open('r+')
+
+    def flush(self):
+        for column in (self.vectors, self.trust, self.verified, self.location, self.ids):
+            column.flush()
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump({'dim': self.dim, 'dtype': self.dtype.name, 'count': self.count,
+                       'capacity': self.capacity, 'locations': self.locations}, f)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, ids, vectors, trust_scores, verified, locations):
+        n = len(ids)
+        if self.count + n > self.capacity:
+            self._grow(self.count + n)
+        codes = []
+        for name in locations:
+            if name not in self._location_code:
+                self._location_code[name] = len(self.locations)
+                self.locations.append(name)
+            codes.append(self._location_code[name])
+        rows = slice(self.count, self.count + n)
+        self.vectors[rows] = np.asarray(vectors, dtype=self.dtype)
+        self.trust[rows] = np.asarray(trust_scores, dtype=np.float32)
+        self.verified[rows] = np.asarray(verified, dtype=bool)
+        self.location[rows] = codes
+        self.ids[rows] = np.asarray(ids, dtype=np.int64)
+        self.count += n
+        self.flush()
+
+    def search(self, query_vector, k=10, min_trust=None, verified=None, locations=None,
+               chunk_rows=65536):
+        """Return up to k (doc_id, cosine) pairs, best first, after optional filters"""
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        if locations is not None:
+            codes = np.array([self._location_code[name] for name in locations
+                              if name in self._location_code], dtype=np.int32)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, self.count, chunk_rows):
+            stop = min(start + chunk_rows, self.count)
+            keep = np.ones(stop - start, dtype=bool)
+            if min_trust is not None:
+                keep &= self.trust[start:stop] >= min_trust
+            if verified is not None:
+                keep &= self.verified[start:stop] == verified
+            if locations is not None:
+                keep &= np.isin(self.location[start:stop], codes)
+            rows = np.flatnonzero(keep)
+            if len(rows) == 0:
+                continue
+            # Rows are unit length, so the dot product is the cosine
+            scores = self.vectors[start:stop][rows].astype(np.float32) @ query
+            best_scores = np.concatenate([best_scores, scores])
+            best_rows = np.concatenate([best_rows, rows + start])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_rows = best_scores[top], best_rows[top]
+        order = np.argsort(-best_scores, kind='stable')
+        return [(int(self.ids[r]), float(s)) for r, s in zip(best_rows[order], best_scores[order])]
+
+    @classmethod
+    def from_frame(cls, path, social_updates_df, embedder, batch_size=4096, dtype=np.float16):
+        """Build (or reopen) a store for a social updates frame; ids are the frame's index labels"""
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            store = cls(path)
+            if len(store) == len(social_updates_df) and store.dim == embedder.dim:
+                return store
+            # Partial or stale build, start over
+            shutil.rmtree(path)
+        store = cls(path, dim=embedder.dim, dtype=dtype)
+        for start in range(0, len(social_updates_df), batch_size):
+            batch = social_updates_df.iloc[start:start + batch_size]
+            store.append(
+                batch.index.to_numpy(),
+                embedder.embed(batch['message'].tolist()),
+                batch['trust_score'].to_numpy(),
+                batch['verified'].to_numpy(),
+                batch['location'].astype(str).tolist(),
+            )
+        return store
+
+
+def prune_stores(root, keep, max_stores=2):
+    """
+    Delete store directories under root, least recently built first, until
+    at most max_stores remain; keep is never deleted. The one before the
+    newest stays for processes still serving the previous data version.
+    """
+    paths = [os.path.join(root, name) for name in os.listdir(root)]
+    stale = sorted((path for path in paths if os.path.isdir(path) and path != keep), key=os.path.getmtime)
+    for path in stale[:max(0, len(stale) - (max_stores - 1))]:
+        shutil.rmtree(path, ignore_errors=True)
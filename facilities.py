@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+RESOURCE_COLUMNS = ['water_supply', 'food_supply', 'medical_kits', 'generators', 'beds', 'last_updated']
+
+
+class FacilityRegistry:
+    """Shelters joined to their resources once, keyed by an integer facility id.
+
+    `frame` keeps the shelters' row order, with facility_id as a RangeIndex.
+    It carries the resource columns, an occupancy percentage and the status
+    class used on the cards. Name and type are categorical. Lookups by name
+    or id go through a dict and iloc, so they cost the same whatever the
+    size of the registry.
+    """
+
+    def __init__(self, shelters_df, resources_df):
+        resources = resources_df.drop_duplicates('location', keep='last')
+        resources = resources[['location'] + [c for c in RESOURCE_COLUMNS if c in resources]]
+        frame = shelters_df.reset_index(drop=True).merge(
+            resources, how='left', left_on='name', right_on='location'
+        ).drop(columns='location')
+        frame.index = pd.RangeIndex(len(frame), name='facility_id')
+
+        frame['occupancy'] = frame['current'] / frame['capacity'] * 100
+        frame['status_class'] = pd.Categorical(np.select(
+            [frame['occupancy'] < 60, frame['occupancy'] < 90],
+            ['status-active', 'status-busy'],
+            'status-full'
+        ))
+        frame['name'] = frame['name'].astype('category')
+        frame['type'] = frame['type'].astype('category')
+        self.frame = frame
+
+        # First facility wins if a name is repeated
+        self._ids = {}
+        for facility_id, name in enumerate(frame['name']):
+            self._ids.setdefault(name, facility_id)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    @property
+    def names(self):
+        return self.frame['name'].tolist()
+
+    @property
+    def types(self):
+        # In order of first appearance, like Series.unique
+        return list(self.frame['type'].unique())
+
+    def id_of(self, name):
+        """Facility id for a name; raises KeyError for unknown names"""
+        return self._ids[name]
+
+    def get(self, name):
+        """Joined shelter + resource row for a facility name"""
+        return self.frame.iloc[self._ids[name]]
+
+    def by_id(self, facility_id):
+        return self.frame.iloc[facility_id]
+
+    def type_mask(self, facility_type=None):
+        """Boolean array over facility ids; None or 'All' selects everything"""
+        if facility_type in (None, 'All'):
+            return np.ones(len(self.frame), dtype=bool)
+        return (self.frame['type'] == facility_type).to_numpy()
+
+    def of_type(self, facility_type=None):
+        if facility_type in (None, 'All'):
+            return self.frame
+        return self.frame[self.type_mask(facility_type)]
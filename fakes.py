@@ -0,0 +1,186 @@
+"""Local stand-ins for the external APIs so the app can be exercised offline."""
+import io
+import re
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+from spatial import haversine_km
+
+
+class StubORSClient:
+    """Answers directions requests with a straight line and a fixed average speed"""
+
+    def __init__(self, speed_kmh=40.0, points_per_route=20, latency_s=0.0):
+        self.speed_kmh = speed_kmh
+        self.points_per_route = points_per_route
+        # Simulated round trip added to every request
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def directions(self, coordinates, profile='driving-car', format='geojson', **kwargs):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        (lon1, lat1), (lon2, lat2) = coordinates[0], coordinates[-1]
+        distance_km = float(haversine_km(lat1, lon1, lat2, lon2))
+        steps = np.linspace(0.0, 1.0, self.points_per_route)
+        line = np.column_stack([lon1 + (lon2 - lon1) * steps, lat1 + (lat2 - lat1) * steps])
+        return {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'LineString', 'coordinates': line.tolist()},
+                'properties': {
+                    'segments': [{
+                        'distance': distance_km * 1000,
+                        'duration': distance_km / self.speed_kmh * 3600,
+                    }],
+                    'summary': {
+                        'distance': distance_km * 1000,
+                        'duration': distance_km / self.speed_kmh * 3600,
+                    },
+                },
+            }],
+        }
+
+    def distance_matrix(self, locations, profile='driving-car', sources=None, destinations=None,
+                        metrics=('duration',), **kwargs):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        points = np.asarray(locations, dtype=np.float64)  # (lon, lat)
+        src = points[sources if sources is not None else slice(None)]
+        dst = points[destinations if destinations is not None else slice(None)]
+        distance_km = haversine_km(src[:, 1:2], src[:, 0:1], dst[None, :, 1], dst[None, :, 0])
+        return {
+            'durations': (distance_km / self.speed_kmh * 3600).tolist(),
+            'distances': (distance_km * 1000).tolist(),
+        }
+
+
+DEFAULT_REPLY = ("Stay indoors and follow official guidance. The nearest shelters are open "
+                 "and medical teams are on standby across Doha.")
+
+
+class FakeGroq:
+    """Groq-shaped client: chat.completions.create and audio.transcriptions.create.
+
+    Every request waits `latency_s` before the first token, then streamed
+    replies arrive in `chunk_chars` pieces `chunk_latency_s` apart. `reply`
+    is either fixed text or a callable taking the messages list.
+    """
+
+    def __init__(self, reply=DEFAULT_REPLY, transcript="Where can I find medical supplies?",
+                 latency_s=0.0, chunk_latency_s=0.0, chunk_chars=16):
+        self.reply = reply
+        self.transcript = transcript
+        self.latency_s = latency_s
+        self.chunk_latency_s = chunk_latency_s
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create_transcription))
+
+    def _reply_text(self, messages):
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _create_completion(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        text = self._reply_text(messages)
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return self._stream(text)
+
+    def _stream(self, text):
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_latency_s)
+            delta = SimpleNamespace(content=text[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def _create_transcription(self, file, model=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        # Like the SDK: a file object or a (filename, bytes) tuple
+        if not isinstance(file, tuple):
+            file.read()
+        return SimpleNamespace(text=self.transcript)
+
+
+class StubTranscriber:
+    """
+    Offline stand-in for Whisper: the "transcript" says how much audio it got
+    ("[3.4 s of speech]"), and each call takes latency_s plus
+    seconds_per_audio_second per second of audio, like a real upload would.
+    """
+
+    def __init__(self, latency_s=0.0, seconds_per_audio_second=0.0):
+        self.latency_s = latency_s
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.calls = 0
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._create))
+
+    def _create(self, file, model=None, **kwargs):
+        from audio import decode_wav
+        self.calls += 1
+        filename, payload = file if isinstance(file, tuple) else (getattr(file, 'name', ''), file.read())
+        try:
+            samples, rate = decode_wav(payload)
+            seconds = len(samples) / rate
+        except Exception:
+            # Not WAV (FLAC upload): assume 16 kHz 16-bit, about half size
+            seconds = len(payload) * 2 / 32000
+        time.sleep(self.latency_s + seconds * self.seconds_per_audio_second)
+        return SimpleNamespace(text=f"[{seconds:.1f} s of speech]")
+
+
+def scenario_reply(messages):
+    """JSON array reply for the admin generators, sized by the 'Generate N ...' request"""
+    request = messages[-1]['content']
+    match = re.search(r'Generate (\d+)', request)
+    count = int(match.group(1)) if match else 10
+    now = time.strftime('%Y-%m-%d %H:%M')
+    if 'alerts' in request:
+        record = ('{{"type": "Sandstorm", "severity": "High", "location": "Doha", "time": "{now}", '
+                  '"description": "Severe sandstorm #{i} approaching with reduced visibility"}}')
+    elif 'facility' in request:
+        record = ('{{"facility": "Shelter {i}", "water": 5000, "food": 2500, "medical": 50, '
+                  '"beds": 400, "current_occupancy": 120, "last_updated": "{now}"}}')
+    else:
+        record = ('{{"source_type": "Official", "username": "@QatarMOI", '
+                  '"message": "Update {i}: roads closed near Doha Corniche", "location": "Doha", '
+                  '"verified": true, "trust_score": 0.95, "timestamp": "{now}", "engagement": 1500}}')
+    return "[" + ",\n".join(record.format(i=i, now=now) for i in range(count)) + "]"
+
+
+def app_reply(messages):
+    """Admin's 'Generate N ...' requests get JSON records, everything else DEFAULT_REPLY"""
+    return scenario_reply(messages) if 'Generate' in messages[-1]['content'] else DEFAULT_REPLY
+
+
+def fake_recording(speech_seconds=3.0, silence_seconds=1.0, rate=44100, channels=2, seed=0):
+    """
+    WAV bytes shaped like an audio_recorder clip: 16-bit PCM at the browser's
+    rate, quiet room noise on both ends and voice-band noise in the middle.
+    """
+    rng = np.random.default_rng(seed)
+    quiet = int(silence_seconds * rate)
+    loud = int(speech_seconds * rate)
+    t = np.arange(loud) / rate
+    # Syllable-rate envelope over a few harmonics, plus a little noise
+    voice = np.sin(2 * np.pi * 4 * t) ** 2 * sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((180, 360, 720), 1))
+    signal = np.concatenate([np.zeros(quiet), 0.3 * voice + 0.01 * rng.standard_normal(loud), np.zeros(quiet)])
+    if quiet:
+        # signal[-0:] would be the whole clip
+        signal[:quiet] += 0.002 * rng.standard_normal(quiet)
+        signal[-quiet:] += 0.002 * rng.standard_normal(quiet)
+    pcm = (np.clip(np.repeat(signal[:, None], channels, axis=1), -1, 1) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
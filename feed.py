@@ -0,0 +1,142 @@
+import numpy as np
+import streamlit as st
+
+SEVERITY_ICONS = {
+    "High": "🔴",
+    "Medium": "🟡",
+    "Low": "🟢"
+}
+
+BADGE_COLORS = {
+    'Official': '#00ff9d',
+    'Healthcare': '#00ff9d',
+    'Emergency': '#00ff9d',
+    'Media': '#ffbe0b',
+    'Citizen': '#888888'
+}
+
+
+def _text(series):
+    # Escape once per column so one stray tag can't break the rest of the page
+    return (series.astype(str)
+            .str.replace('&', '&amp;', regex=False)
+            .str.replace('<', '&lt;', regex=False)
+            .str.replace('>', '&gt;', regex=False))
+
+
+def alert_cards_html(alerts_df):
+    """One HTML string with an alert-box card per row, built column-wise"""
+    if alerts_df.empty:
+        return ""
+    # astype(object): a Categorical can't take the fallback as a new category
+    icons = alerts_df['severity'].astype(object).map(SEVERITY_ICONS).fillna("⚪")
+    cards = (
+        '<div class="alert-box">'
+        + '<h3>' + icons + ' ' + _text(alerts_df['type']) + ' Alert</h3>'
+        + '<p>📍 <b>Location:</b> ' + _text(alerts_df['location']) + '</p>'
+        + '<p>🕒 <b>Time:</b> ' + _text(alerts_df['time']) + '</p>'
+        + '<p>⚠️ <b>Severity:</b> ' + _text(alerts_df['severity']) + '</p>'
+        + '<p>ℹ️ <b>Details:</b> ' + _text(alerts_df['description']) + '</p>'
+        + '</div>'
+    )
+    return "\n".join(cards)
+
+
+def update_cards_html(updates_df):
+    """One HTML string with a social-update card per row, built column-wise"""
+    if updates_df.empty:
+        return ""
+    trust = updates_df['trust_score'].to_numpy(dtype=float)
+    verified = updates_df['verified'].to_numpy(dtype=bool)
+    # Object arrays so numpy strings concatenate with the pandas columns
+    trust_class = np.select([trust >= 0.9, trust >= 0.7], ["trust-high", "trust-medium"], "trust-low").astype(object)
+    badge = np.where(verified, "verified", "unverified").astype(object)
+    mark = np.where(verified, ' ✓', '✕').astype(object)
+    account = _text(updates_df['account_type'])
+    colors = updates_df['account_type'].astype(object).map(BADGE_COLORS).fillna('#888888')
+    cards = (
+        "<div class='social-update " + trust_class + "'>"
+        + '<div class="update-header"><div class="account-info">'
+        + '<strong style="color: ' + colors + '">' + account + '</strong>'
+        + '<span class="username">' + _text(updates_df['username']) + '</span>'
+        + '<span class="badge ' + badge + '">'
+        + mark + '</span>'
+        + '</div></div>'
+        + '<div class="update-content">' + _text(updates_df['message']) + '</div>'
+        + '<div class="update-meta">'
+        + '<span class="meta-item">📍 ' + _text(updates_df['location']) + '</span>'
+        + '<span class="meta-separator">|</span>'
+        + '<span class="meta-item">💯 Trust: ' + np.char.mod('%.2f', trust).astype(object) + '</span>'
+        + '<span class="meta-separator">|</span>'
+        + '<span class="meta-item">👥 ' + updates_df['engagement'].astype(str) + '</span>'
+        + '</div></div>'
+    )
+    return "\n".join(cards)
+
+
+def feed_page(df, key, page_size=20, cursor_column=None, filters=None):
+    """
+    Slice one page of a feed for this session. When cursor_column is given
+    the feed is anchored on its newest value when first shown: rows newer
+    than the anchor are held back and counted, so arriving items don't shift
+    the page being read. Changing `filters` starts again from the top.
+    Returns (page_df, info) with the page, pages, total, new and start counts.
+    """
+    state = st.session_state.setdefault(f"{key}_feed", {'page': 0, 'anchor': None, 'filters': None})
+    if state['filters'] != filters:
+        state.update(page=0, anchor=None, filters=filters)
+
+    visible = df
+    new = 0
+    if cursor_column is not None and not df.empty:
+        if state['anchor'] is None:
+            state['anchor'] = df[cursor_column].max()
+        newer = (df[cursor_column] > state['anchor']).to_numpy()
+        new = int(newer.sum())
+        if new:
+            visible = df[~newer]
+
+    pages = max(1, -(-len(visible) // page_size))
+    state['page'] = min(state['page'], pages - 1)
+    start = state['page'] * page_size
+    return visible.iloc[start:start + page_size], {
+        'page': state['page'], 'pages': pages, 'total': len(visible), 'new': new, 'start': start
+    }
+
+
+def _move(key, step):
+    st.session_state[f"{key}_feed"]['page'] += step
+
+
+def _show_new(key):
+    st.session_state[f"{key}_feed"].update(page=0, anchor=None)
+
+
+def render_feed(df, card_html, key, page_size=20, cursor_column=None, filters=None, noun="items"):
+    """
+    Render one page of df as a single markdown element with Newer/Older
+    controls. Only the current page is formatted and sent, so the payload
+    stays the same size however long the feed gets.
+    """
+    page_df, info = feed_page(df, key, page_size, cursor_column, filters)
+
+    if info['new']:
+        st.button(f"🔄 {info['new']} new {noun}", key=f"{key}_show_new", on_click=_show_new, args=(key,))
+
+    if page_df.empty:
+        st.info(f"No {noun} to show.")
+        return page_df
+    st.markdown(card_html(page_df), unsafe_allow_html=True)
+
+    if info['pages'] > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("← Newer", key=f"{key}_newer", disabled=info['page'] == 0,
+                      on_click=_move, args=(key, -1))
+        with col2:
+            st.caption(f"Showing {info['start'] + 1}–{info['start'] + len(page_df)} of {info['total']} {noun} "
+                       f"(page {info['page'] + 1}/{info['pages']})")
+        with col3:
+            st.button("Older →", key=f"{key}_older", disabled=info['page'] >= info['pages'] - 1,
+                      on_click=_move, args=(key, 1))
+    return page_df
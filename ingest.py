@@ -0,0 +1,388 @@
+"""
+Live social update ingestion: sources -> batch validation -> dedup -> ring buffer.
+
+A LiveFeed polls a source (a tailed JSON-lines file, or StubSource for
+local runs) in the background. It validates each batch column-wise and
+drops exact and retweet-style repeats by hashing normalised text. Kept
+rows are given a trust score and go into a fixed-size ring buffer, and a
+BM25 index (plus optional embeddings) follows the buffer as rows arrive
+and are evicted.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from json_stream import TRUE_STRINGS, FALSE_STRINGS
+from retrieval import BM25Index
+from trust import TrustScorer
+
+ACCOUNT_TYPES = ['Official', 'Citizen', 'Emergency', 'Healthcare', 'Media']
+
+UPDATE_COLUMNS = ['timestamp', 'source', 'account_type', 'username', 'message', 'location',
+                  'trust_score', 'verified', 'engagement', 'emergency_type']
+
+# Optional fields and the value used when a record leaves them out
+DEFAULTS = {'source': 'Twitter', 'emergency_type': 'Multiple'}
+
+
+def dedup_keys(messages):
+    """
+    uint64 key per message that ignores retweet prefixes, links, mentions,
+    case and punctuation, so "RT @x: Roads closed!" and "roads closed"
+    collide.
+    """
+    text = (messages.astype(str).str.lower()
+            .str.replace(r'^(rt\s+)?@\w+:?\s*', '', regex=True)
+            .str.replace(r'https?://\S+|@\w+', ' ', regex=True)
+            .str.replace(r'[^a-z0-9]+', ' ', regex=True)
+            .str.strip())
+    return pd.util.hash_pandas_object(text, index=False).to_numpy()
+
+
+def _to_bool(values):
+    lowered = values.astype(str).str.strip().str.lower()
+    out = pd.Series(np.nan, index=values.index, dtype=object)
+    out[lowered.isin(TRUE_STRINGS)] = True
+    out[lowered.isin(FALSE_STRINGS)] = False
+    return out
+
+
+def validate_frame(df, max_message_chars=500):
+    """
+    Coerce a batch of raw updates column-wise. Returns (valid_df, n_invalid);
+    rows with a missing or out-of-range field are dropped. trust_score may
+    be missing (NaN), since the feed scores updates itself.
+    """
+    df = df.reindex(columns=UPDATE_COLUMNS)
+    for column, default in DEFAULTS.items():
+        df[column] = df[column].fillna(default)
+
+    out = pd.DataFrame(index=df.index)
+    # Mixed offsets only parse as UTC; stored naive like the rest of the app
+    out['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', format='ISO8601',
+                                      utc=True).dt.tz_convert(None)
+    canonical = {name.lower(): name for name in ACCOUNT_TYPES}
+    out['account_type'] = df['account_type'].astype(str).str.strip().str.lower().map(canonical)
+    for column in ['source', 'username', 'location', 'emergency_type']:
+        out[column] = df[column].astype(str).str.strip().replace({'': None, 'nan': None, 'None': None})
+    out['message'] = df['message'].astype(str).str.strip().str.slice(0, max_message_chars)
+    out.loc[df['message'].isna() | (out['message'] == ''), 'message'] = None
+    out['trust_score'] = pd.to_numeric(df['trust_score'], errors='coerce')
+    out.loc[(out['trust_score'] < 0) | (out['trust_score'] > 1), 'trust_score'] = np.nan
+    out['verified'] = df['verified'] if df['verified'].dtype == bool else _to_bool(df['verified'])
+    out['engagement'] = pd.to_numeric(df['engagement'], errors='coerce')
+    out.loc[out['engagement'] < 0, 'engagement'] = np.nan
+
+    valid = out.drop(columns='trust_score').notna().all(axis=1)
+    out = out[valid].astype({'trust_score': np.float32, 'verified': bool, 'engagement': np.int64})
+    return out[UPDATE_COLUMNS].reset_index(drop=True), int((~valid).sum())
+
+
+def parse_lines(lines, max_message_chars=500):
+    """JSON lines -> (valid_df, n_invalid); unparsable lines (and None, for unreadable ones) count as invalid"""
+    records = []
+    invalid = 0
+    for line in lines:
+        if line is None:
+            invalid += 1
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            invalid += 1
+            continue
+        if isinstance(record, dict):
+            records.append(record)
+        else:
+            invalid += 1
+    if not records:
+        return pd.DataFrame(columns=UPDATE_COLUMNS), invalid
+    valid, bad = validate_frame(pd.DataFrame.from_records(records), max_message_chars)
+    return valid, invalid + bad
+
+
+class JSONLSource:
+    """Tails a JSON-lines file; a partly written last line waits for the next poll.
+
+    A line longer than max_bytes is skipped and comes back as None.
+    """
+
+    def __init__(self, path, from_start=True, max_bytes=8 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+        self._skipping = False
+
+    def poll(self, max_lines):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self._offset:
+            # Truncated or rotated: start over
+            self._offset = 0
+            self._skipping = False
+        if size == self._offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(self.max_bytes)
+            while self._skipping and data:
+                # Drop the rest of an oversized line, up to its newline
+                end = data.find(b'\n')
+                if end < 0:
+                    self._offset += len(data)
+                    data = f.read(self.max_bytes)
+                else:
+                    self._offset += end + 1
+                    data = data[end + 1:]
+                    self._skipping = False
+        lines = data.split(b'\n')[:-1][:max_lines]
+        if not lines and len(data) == self.max_bytes:
+            # No newline in a full read: waiting would stall the source for good
+            self._offset += len(data)
+            self._skipping = True
+            return [None]
+        self._offset += sum(len(line) + 1 for line in lines)
+        return [line.decode('utf-8', errors='replace') for line in lines]
+
+
+class StubSource:
+    """Synthetic updates at a steady rate, with some exact repeats and retweets mixed in"""
+
+    def __init__(self, rate=50.0, repeat_share=0.15, seed=0):
+        from synthetic_data import iter_social_updates
+        self._updates = iter_social_updates
+        self.rate = rate
+        self.repeat_share = repeat_share
+        self._rng = np.random.default_rng(seed)
+        self._seed = seed
+        self._batches = 0
+        self._last = time.monotonic()
+        self._recent = []
+
+    def poll(self, max_lines):
+        now = time.monotonic()
+        n = min(max_lines, int((now - self._last) * self.rate))
+        if n <= 0:
+            return []
+        self._last += n / self.rate
+        self._batches += 1
+        batch = next(self._updates(n, chunk_size=n, seed=self._seed + self._batches, now=datetime.now()))
+        batch['timestamp'] = datetime.now().isoformat(timespec='seconds')
+        # Templates repeat a lot, so tag each message to make it unique
+        batch['message'] = batch['message'] + ' Ref ' + pd.Series(
+            self._rng.integers(0, 10 ** 9, n)).astype(str).to_numpy()
+        records = batch.to_dict('records')
+        for i in np.flatnonzero(self._rng.random(n) < self.repeat_share):
+            if self._recent:
+                original = self._recent[self._rng.integers(len(self._recent))]
+                records[i] = dict(records[i], message=f"RT {original['username']}: {original['message']}")
+        self._recent = (self._recent + records)[-1000:]
+        return [json.dumps(record, default=str) for record in records]
+
+
+class UpdateRing:
+    """Fixed-capacity columnar buffer; row seq lives in slot seq % capacity"""
+
+    DTYPES = {'timestamp': 'datetime64[ns]', 'source': object, 'account_type': object, 'username': object,
+              'message': object, 'location': object, 'trust_score': np.float32, 'verified': bool,
+              'engagement': np.int64, 'emergency_type': object}
+
+    def __init__(self, capacity, dim=None):
+        self.capacity = capacity
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.DTYPES.items()}
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.vectors = np.zeros((capacity, dim), dtype=np.float16) if dim else None
+        self.next_seq = 0
+        self.size = 0
+
+    def append(self, df, keys, vectors=None):
+        """Write rows, overwriting the oldest; returns (seqs, evicted seqs, evicted keys)"""
+        if len(df) > self.capacity:
+            df, keys = df.iloc[-self.capacity:], keys[-self.capacity:]
+            vectors = None if vectors is None else vectors[-self.capacity:]
+        n = len(df)
+        seqs = np.arange(self.next_seq, self.next_seq + n)
+        slots = seqs % self.capacity
+        overwritten = max(0, self.size + n - self.capacity)
+        evicted = np.arange(self.next_seq - self.size, self.next_seq - self.size + overwritten)
+        evicted_keys = self.keys[evicted % self.capacity].copy()
+
+        for name, column in self.columns.items():
+            column[slots] = df[name].to_numpy()
+        self.keys[slots] = keys
+        if self.vectors is not None and vectors is not None:
+            self.vectors[slots] = vectors
+        self.next_seq += n
+        self.size = min(self.capacity, self.size + n)
+        return seqs, evicted, evicted_keys
+
+    def seqs(self):
+        """Buffered seqs, oldest first"""
+        return np.arange(self.next_seq - self.size, self.next_seq)
+
+    def frame(self, seqs):
+        slots = np.asarray(seqs) % self.capacity
+        return pd.DataFrame({name: column[slots] for name, column in self.columns.items()})
+
+
+class LiveFeed:
+    """Ring-buffered live updates with dedup and an index that follows the buffer.
+
+    query() has the same shape as UpdateStore.query, so the Updates tab can
+    read from either. Readers only touch the buffered rows; nothing is
+    rebuilt when a batch arrives.
+    """
+
+    def __init__(self, source=None, capacity=50000, batch_size=5000, max_message_chars=500, embedder=None,
+                 scorer=None):
+        self.source = source
+        self.scorer = scorer or TrustScorer()
+        self.batch_size = batch_size
+        self.max_message_chars = max_message_chars
+        self.embedder = embedder
+        self.ring = UpdateRing(capacity, embedder.dim if embedder else None)
+        self.index = BM25Index()
+        self._seen = set()
+        self._account_types = set()
+        self._lock = threading.Lock()
+        # Writers (poll thread, sync_frame) take turns so dedup sees every earlier batch
+        self._ingest_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._synced_version = None
+        self.stats = {'received': 0, 'invalid': 0, 'duplicates': 0, 'appended': 0, 'evicted': 0,
+                      'last_batch_per_second': 0.0}
+
+    def __len__(self):
+        return self.ring.size
+
+    @property
+    def account_types(self):
+        return sorted(self._account_types)
+
+    def ingest_lines(self, lines):
+        start = time.perf_counter()
+        df, invalid = parse_lines(lines, self.max_message_chars)
+        self.stats['invalid'] += invalid
+        return self._ingest(df, len(lines), start)
+
+    def ingest_frame(self, df):
+        """Add rows from a social_updates_df-shaped frame (seed or admin data)"""
+        start = time.perf_counter()
+        valid, invalid = validate_frame(df, self.max_message_chars)
+        self.stats['invalid'] += invalid
+        return self._ingest(valid, len(df), start)
+
+    def sync_frame(self, version, df):
+        """ingest_frame once per data version, so republished tables flow into the buffer"""
+        if version != self._synced_version:
+            self.ingest_frame(df)
+            self._synced_version = version
+
+    def _ingest(self, df, received, start):
+        with self._ingest_lock:
+            return self._ingest_locked(df, received, start)
+
+    def _ingest_locked(self, df, received, start):
+        self.stats['received'] += received
+        if df.empty:
+            return 0
+        keys = dedup_keys(df['message'])
+        keep = ~pd.Series(keys).duplicated().to_numpy()
+        keep &= np.fromiter((key not in self._seen for key in keys.tolist()), dtype=bool, count=len(keys))
+        self.stats['duplicates'] += int((~keep).sum())
+        df, keys = df[keep], keys[keep]
+        if df.empty:
+            return 0
+        # Scored after dedup so repeats don't count as corroboration or build reputation
+        df = df.assign(trust_score=self.scorer.score(df))
+        vectors = self.embedder.embed(df['message'].tolist()) if self.embedder else None
+
+        with self._lock:
+            seqs, evicted, evicted_keys = self.ring.append(df, keys, vectors)
+            self._seen.difference_update(evicted_keys.tolist())
+            self._seen.update(self.ring.keys[seqs % self.ring.capacity].tolist())
+            for seq in evicted.tolist():
+                self.index.remove(seq)
+            self.index.add_many(seqs.tolist(), df['message'].iloc[-len(seqs):])
+            self._account_types.update(df['account_type'].unique().tolist())
+
+        self.stats['appended'] += len(seqs)
+        self.stats['evicted'] += len(evicted)
+        elapsed = time.perf_counter() - start
+        self.stats['last_batch_per_second'] = received / elapsed if elapsed else 0.0
+        return len(seqs)
+
+    def poll(self):
+        """Pull and ingest one batch from the source; returns the number of lines read"""
+        lines = self.source.poll(self.batch_size) if self.source else []
+        if lines:
+            self.ingest_lines(lines)
+        return len(lines)
+
+    def start(self, interval=1.0):
+        """Poll in a daemon thread until stop(); a full batch polls again straight away"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    read = self.poll()
+                except Exception:
+                    read = 0
+                if read < self.batch_size:
+                    self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, daemon=True, name="live-feed")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def query(self, min_trust=0.0, account_types=None, since=None):
+        """Buffered updates passing the filters, newest first, like UpdateStore.query"""
+        with self._lock:
+            seqs = self.ring.seqs()
+            slots = seqs % self.ring.capacity
+            columns = self.ring.columns
+            mask = columns['trust_score'][slots] >= np.float32(min_trust)
+            if account_types is not None:
+                mask &= np.isin(columns['account_type'][slots], list(account_types))
+            if since is not None:
+                mask &= columns['timestamp'][slots] >= np.datetime64(pd.Timestamp(since))
+            selected = seqs[mask]
+            # Arrival order is close to time order; keep ties stable, newest first
+            frame = self.ring.frame(selected)
+            frame['seq'] = selected
+        return frame.iloc[np.argsort(frame['timestamp'].to_numpy(), kind='stable')[::-1]].reset_index(drop=True)
+
+    def search(self, query, k=10):
+        """BM25 over the buffer: [(seq, score)] best first"""
+        with self._lock:
+            return self.index.search(query, k)
+
+    def semantic_search(self, query_vector, k=10):
+        with self._lock:
+            if self.ring.vectors is None or self.ring.size == 0:
+                return []
+            seqs = self.ring.seqs()
+            scores = self.ring.vectors[seqs % self.ring.capacity].astype(np.float32) @ query_vector
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(seqs[i]), float(scores[i])) for i in top]
+
+    def messages(self, seqs):
+        with self._lock:
+            live = [seq for seq in seqs if self.ring.next_seq - self.ring.size <= seq < self.ring.next_seq]
+            return self.ring.columns['message'][np.asarray(live, dtype=np.int64) % self.ring.capacity].tolist()
@@ -0,0 +1,144 @@
+import json
+import math
+
+import pandas as pd
+
+TRUE_STRINGS = {'true', 'yes', '1', 'y', 't'}
+FALSE_STRINGS = {'false', 'no', '0', 'n', 'f'}
+# records_to_frame stores int fields as int32
+INT_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+class Field:
+    """One column of a record schema: how to coerce it and which values are valid"""
+
+    def __init__(self, name, kind='str', choices=None, minimum=None, maximum=None):
+        # kind is one of str, category, int, float, bool, datetime
+        self.name = name
+        self.kind = kind
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def coerce(self, value):
+        if value is None:
+            raise ValueError(f"{self.name} is missing")
+        if self.kind in ('str', 'category'):
+            value = str(value).strip()
+            if not value:
+                raise ValueError(f"{self.name} is empty")
+            if self.choices is not None:
+                # LLMs drift on case, so match case-insensitively onto the canonical value
+                matches = [choice for choice in self.choices if choice.lower() == value.lower()]
+                if not matches:
+                    raise ValueError(f"{self.name}={value!r} not in {self.choices}")
+                value = matches[0]
+        elif self.kind == 'int':
+            number = float(str(value).replace(',', ''))
+            if not math.isfinite(number) or not INT_RANGE[0] <= round(number) <= INT_RANGE[1]:
+                raise ValueError(f"{self.name}={value} is not a 32-bit integer")
+            value = int(round(number))
+        elif self.kind == 'float':
+            value = float(str(value).replace(',', ''))
+            if not math.isfinite(value):
+                raise ValueError(f"{self.name}={value} is not a number")
+        elif self.kind == 'bool':
+            if not isinstance(value, bool):
+                text = str(value).strip().lower()
+                if text not in TRUE_STRINGS | FALSE_STRINGS:
+                    raise ValueError(f"{self.name}={value!r} is not a boolean")
+                value = text in TRUE_STRINGS
+        elif self.kind == 'datetime':
+            value = pd.Timestamp(value)
+            if pd.isna(value):
+                raise ValueError(f"{self.name} is not a timestamp")
+            # Store everything as naive UTC so a batch with mixed offsets fits one column
+            if value.tzinfo is not None:
+                value = value.tz_convert(None)
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{self.name}={value} below {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{self.name}={value} above {self.maximum}")
+        return value
+
+
+def validate_record(record, schema):
+    """Return a coerced copy of record with exactly the schema's fields, or raise ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    return {field.name: field.coerce(record.get(field.name)) for field in schema}
+
+
+def records_to_frame(records, schema):
+    """Build a DataFrame with compact dtypes from validated records"""
+    dtypes = {'category': 'category', 'int': 'int32', 'float': 'float32', 'bool': 'bool',
+              'datetime': 'datetime64[ns]', 'str': 'object'}
+    if not records:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_records(records, columns=[field.name for field in schema])
+    return df.astype({field.name: dtypes[field.kind] for field in schema})
+
+
+class RecordStream:
+    """Pulls JSON objects out of a streamed array as soon as each one closes.
+
+    Text outside objects (the array brackets, commas, code fences or prose
+    around the JSON) is skipped, so a truncated or chatty reply still yields
+    every complete record. Each object is validated on its own; bad ones are
+    kept in `invalid` instead of failing the batch.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.invalid = []
+        self.valid_count = 0
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Consume a chunk of the reply and return the records it completed"""
+        records = []
+        for char in text:
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._buffer = [char]
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    record = self._finish(''.join(self._buffer))
+                    if record is not None:
+                        records.append(record)
+        return records
+
+    def _finish(self, raw):
+        try:
+            record = validate_record(json.loads(raw), self.schema)
+        except (ValueError, TypeError, OverflowError) as e:
+            self.invalid.append((raw, str(e)))
+            return None
+        self.valid_count += 1
+        return record
+
+    def close(self):
+        """Flag an object left open by a truncated reply"""
+        if self._depth:
+            self.invalid.append((''.join(self._buffer), 'truncated'))
+            self._depth = 0
+            self._in_string = self._escape = False
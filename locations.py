@@ -0,0 +1,22 @@
+"""Approximate centre coordinates [lat, lon] for Qatar place names used in the data."""
+
+QATAR_LOCATIONS = {
+    'Doha': [25.2854, 51.5310],
+    'Al Wakrah': [25.1659, 51.5976],
+    'Al Khor': [25.6839, 51.5058],
+    'Al Rayyan': [25.2919, 51.4244],
+    'Lusail': [25.4207, 51.4904],
+    'Umm Salal': [25.4152, 51.4065],
+    'Al Daayen': [25.5785, 51.4823],
+    'Mesaieed': [24.9909, 51.5493],
+    'Dukhan': [25.4298, 50.7845],
+    'Al Shamal': [26.1293, 51.2009],
+    'West Bay': [25.3287, 51.5309],
+    'The Pearl': [25.3741, 51.5503],
+    'Education City': [25.3149, 51.4400],
+    'Aspire Zone': [25.2684, 51.4481],
+    'Al Waab': [25.2590, 51.4782],
+}
+
+# Country-wide messages ("Qatar") resolve to the whole peninsula
+QATAR_CENTER = [25.3548, 51.1839]
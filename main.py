@@ -1,16 +1,32 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
 from datetime import datetime, timedelta
-from groq import Groq
-import numpy as np
-from audio_recorder_streamlit import audio_recorder
-import tempfile
 import os
+import time
 import warnings
-import openrouteservice
+from clients import ClientPool
+from spatial import ShelterIndex, ImpactIndex
+from route_cache import RouteCache
+from travel_matrix import TravelTimeMatrix, ORSMatrixProvider, HaversineProvider
+from retrieval import BM25Index
+from embeddings import HashingEmbedder, EmbeddingStore, prune_stores
+from completion_cache import CompletionCache
+from audio import TranscriptCache
+from feed import render_feed, alert_cards_html, update_cards_html
+from map_layers import TYPE_COLORS, add_clustered_facilities, in_bounds
+from facilities import FacilityRegistry
+from update_store import UpdateStore
+from ingest import LiveFeed, JSONLSource, StubSource
+from trust import TrustScorer
+from allocation import EvacuationPlanner, free_places
+from forecast import DepletionForecast, SCENARIOS, format_hours
+from data_store import (SharedDataStore, StoreReader, alerts_from_disasters,
+                        social_updates_from_updates, apply_resource_reports)
+from startup import RunTimer, lazy_import
+
+# Times this run for the cold-start / rerun report at the end of main()
+run_timer = RunTimer("main.py")
 warnings.filterwarnings('ignore')
 # Page config must be the first Streamlit command
 st.set_page_config(
@@ -25,10 +41,16 @@ st.set_page_config(
     }
 )
 
+@st.cache_data
+def read_asset(file_name, mtime):
+    # Read once per process; the mtime argument picks up edits to the file
+    with open(file_name) as f:
+        return f.read()
+
 # Near the top of your app.py, after the imports
 def load_css(file_name):
-    with open(file_name) as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+    css = read_asset(file_name, os.path.getmtime(file_name))
+    st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
 
 # Remove the existing st.markdown() call with the CSS content
 # And replace it with:
@@ -40,21 +62,20 @@ try:
     GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
 except:
     # Fallback to local environment variable (for local development)
-    GROQ_API_KEY = "GROQ_API_KEY"
+    GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "GROQ_API_KEY")
 
 
 # Add your ORS API Key here
 ORS_API_KEY = "5b3ce3597851110001cf6248103965714d2b49cead7eb8d2e234f3e6"
-ors_client = openrouteservice.Client(key=ORS_API_KEY)  # Initialize ORS client
 
+@st.cache_resource
+def get_clients():
+    # One pooled, lazily built Groq/ORS client pair per process instead of one per rerun
+    return ClientPool(groq_api_key=GROQ_API_KEY, ors_api_key=ORS_API_KEY)
+
+groq_client = get_clients().groq
+ors_client = get_clients().ors
 
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-    st.success("Successfully initialized Groq client!")
-except Exception as e:
-    st.error(f"Failed to initialize Groq client: {str(e)}")
-    st.error("Please ensure GROQ_API_KEY is properly set in Streamlit Cloud secrets")
-    st.stop()
 # Generate simulated data
 @st.cache_data
 def generate_data():
@@ -134,24 +155,316 @@ def generate_data():
 
     return alerts_df, shelters_df, resources_df, social_updates_df
 
+# Define common locations in Doha
+doha_locations = {
+    "Doha City Center": [25.3548, 51.1839],
+    "West Bay": [25.3287, 51.5309],
+    "The Pearl": [25.3741, 51.5503],
+    "Katara Cultural Village": [25.3594, 51.5277],
+    "Hamad International Airport": [25.2608, 51.6138],
+    "Education City": [25.3149, 51.4400],
+    "Souq Waqif": [25.2867, 51.5333],
+    "Aspire Zone": [25.2684, 51.4481],
+    "Msheireb Downtown": [25.2897, 51.5335],
+    "Al Waab": [25.2590, 51.4782]
+}
+
+@st.cache_resource
+def get_travel_matrix(shelters_df):
+    # Origins x shelters drive times, filled in the background and kept on disk
+    matrix = TravelTimeMatrix(
+        doha_locations,
+        shelters_df,
+        ORSMatrixProvider(ors_client),
+        path=os.path.join('.cache', 'travel_matrix.npz')
+    )
+    matrix.refresh_in_background()
+    return matrix
+
+@st.cache_resource
+def get_evacuation_planner(shelters_df, drive_times_ready):
+    """Shared zone -> shelter solver; rebuilt once the drive times have all arrived"""
+    matrix = get_travel_matrix(shelters_df)
+    # Until then, cells ORS hasn't returned yet are straight-line estimates
+    return EvacuationPlanner(matrix.origin_names, matrix.shelter_names,
+                             matrix.filled_durations(fallback=HaversineProvider()))
+
+@st.cache_resource
+def get_route_cache():
+    # Shared by every session; routes survive restarts in the SQLite tier
+    return RouteCache(os.path.join('.cache', 'routes.sqlite'))
+
+@st.cache_resource
+def get_completion_cache():
+    # Answers shared across sessions; reruns and repeat questions skip the API
+    return CompletionCache(os.path.join('.cache', 'completions.sqlite'))
+
+@st.cache_resource
+def get_transcript_cache():
+    # Keyed on the recording's hash; a re-sent clip skips the upload
+    return TranscriptCache(os.path.join('.cache', 'transcripts.sqlite'))
+
+@st.cache_resource
+def get_shelter_index(shelters_df):
+    # Built once per version of the shelters data and shared across reruns
+    return ShelterIndex(shelters_df)
+
+@st.cache_resource
+def get_store_reader():
+    # One reader per process: unchanged tables are never reloaded
+    return StoreReader(SharedDataStore())
+
+@st.cache_resource(max_entries=4)
+def build_app_data(versions_key):
+    """Seed data overlaid with the tables admin has published, shared by every session"""
+    alerts_df, shelters_df, resources_df, social_updates_df = generate_data()
+    # An empty key (nothing published, or the store is down) is just the seed data
+    _, tables = get_store_reader().snapshot(versions=dict(versions_key)) if versions_key else ({}, {})
+    if tables.get('disasters') is not None and not tables['disasters'].empty:
+        alerts_df = alerts_from_disasters(tables['disasters'])
+    if tables.get('updates') is not None and not tables['updates'].empty:
+        social_updates_df = social_updates_from_updates(tables['updates'])
+    if tables.get('resources') is not None and not tables['resources'].empty:
+        shelters_df, resources_df = apply_resource_reports(shelters_df, resources_df, tables['resources'])
+    return alerts_df, shelters_df, resources_df, social_updates_df
+
+@st.cache_resource(max_entries=4)
+def build_facility_registry(versions_key):
+    """Shelters joined to resources once per data version, shared by every tab and session"""
+    _, shelters_df, resources_df, _ = build_app_data(versions_key)
+    return FacilityRegistry(shelters_df, resources_df)
+
+def data_version():
+    """Version key of the shared store; a single small query per rerun"""
+    try:
+        versions = get_store_reader().store.versions()
+    except Exception as e:
+        st.warning(f"Shared data store unavailable, showing default data: {str(e)}")
+        versions = {}
+    return tuple(sorted(versions.items()))
+
+def load_app_data():
+    """
+    (versions_key, app data) for this rerun. A publish landing between the
+    version check and the load retries once with the new versions; if the
+    store still can't be read, the seed data is shown instead.
+    """
+    for _ in range(2):
+        versions_key = data_version()
+        try:
+            return versions_key, build_app_data(versions_key)
+        except Exception as e:
+            error = e
+    st.warning(f"Shared data store unavailable, showing default data: {str(error)}")
+    return (), build_app_data(())
+
 def find_nearest_shelter(shelters_df, user_location, query_type="medical supplies"):
     """
     Find the nearest shelter to the user's location based on query type.
     """
-    # Simulate finding the nearest shelter by calculating distances
-    shelters_df["distance"] = shelters_df.apply(
-        lambda row: np.sqrt((row["lat"] - user_location[0])**2 + (row["lon"] - user_location[1])**2),
-        axis=1
-    )
-    nearest_shelter = shelters_df.loc[shelters_df["distance"].idxmin()]
+    # Great-circle lookup through the cached index, shelters_df is left untouched.
+    # Full shelters are skipped unless every one of them is full.
+    index = get_shelter_index(shelters_df)
+    nearest = index.nearest(user_location, k=1, min_free_capacity=1)
+    if nearest.empty:
+        nearest = index.nearest(user_location, k=1)
+    nearest_shelter = nearest.iloc[0]
     return nearest_shelter
 
-def process_query_with_rag_and_map(query, social_updates_df, shelters_df):
+@st.cache_resource(max_entries=4)
+def build_update_store(versions_key):
+    """Time-indexed updates with cached filter results, one per data version"""
+    _, _, _, social_updates_df = build_app_data(versions_key)
+    # The Trust Score Filter works on computed scores, not the ones the rows came with
+    scores = TrustScorer().score_frame(social_updates_df)
+    return UpdateStore(social_updates_df.assign(trust_score=scores))
+
+@st.cache_resource(max_entries=4)
+def build_impact_index(versions_key):
+    """Alerts, facilities and (scored) updates joined on a spatial grid, once per data version"""
+    alerts_df, _, _, _ = build_app_data(versions_key)
+    return ImpactIndex(alerts_df, build_facility_registry(versions_key).frame,
+                       build_update_store(versions_key).frame.reset_index())
+
+@st.cache_resource(max_entries=4)
+def build_depletion_forecast(versions_key):
+    """Hours of supplies left per facility under every scenario, once per data version"""
+    return DepletionForecast(build_facility_registry(versions_key).frame)
+
+def updates_near(versions_key, lat, lon, radius_km=5.0, limit=5):
+    """Newest updates about places near a point, from the live buffer when ingestion is on"""
+    impact = build_impact_index(versions_key)
+    live_feed = get_live_feed()
+    if live_feed is None:
+        return impact.updates_near(lat, lon, radius_km, limit=limit)
+    places = impact.places_near(lat, lon, radius_km)
+    updates = live_feed.query()
+    return updates[updates['location'].isin(places['location'])].head(limit)
+
+@st.cache_resource
+def get_live_feed():
+    """
+    Background ingestion of live updates when ANTNA_LIVE_SOURCE is set: a
+    JSON-lines file to tail, or "stub" for synthetic traffic. None otherwise.
+    """
+    source = os.environ.get('ANTNA_LIVE_SOURCE')
+    if not source:
+        return None
+    feed = LiveFeed(StubSource() if source == 'stub' else JSONLSource(source), embedder=HashingEmbedder())
+    feed.start()
+    return feed
+
+# Updates tab time windows, in minutes
+UPDATE_WINDOWS = {
+    "All time": None,
+    "Last 30 min": 30,
+    "Last hour": 60,
+    "Last 6 hours": 6 * 60,
+    "Last 24 hours": 24 * 60
+}
+
+def build_facility_map(facilities, center, clustered=True, zoom=12):
+    """
+    Folium map centred on the user's location with the facilities (rows of
+    FacilityRegistry.frame) on it: a clustered GeoJSON layer by default, or
+    one marker per facility.
+    """
+    folium = lazy_import('folium')
+    m = folium.Map(
+        location=center,  # Center map on selected current location
+        zoom_start=zoom,
+        tiles="cartodbpositron"
+    )
+    if clustered:
+        add_clustered_facilities(m, facilities)
+        return m
+
+    # Add markers for all locations
+    for location in facilities.itertuples(index=False):
+        color = TYPE_COLORS.get(location.type, 'gray')
+
+        popup_content = f"""
+            <div style="width: 200px">
+                <h4>{location.name}</h4>
+                <p><b>Type:</b> {location.type}</p>
+                <p><b>Contact:</b> {location.contact}</p>
+                <p><b>Occupancy:</b> {location.occupancy:.1f}%</p>
+                <p><b>Resources:</b></p>
+                <ul>
+                    <li>Water: {location.water_supply} units</li>
+                    <li>Food: {location.food_supply} units</li>
+                    <li>Medical: {location.medical_kits} kits</li>
+                </ul>
+            </div>
+        """
+
+        marker = folium.Marker(
+            location=[location.lat, location.lon],
+            popup=folium.Popup(popup_content, max_width=300),
+            icon=folium.Icon(color=color, icon='info-sign'),
+        )
+        marker.add_to(m)
+    return m
+
+@st.cache_resource
+def get_update_index(social_updates_df):
+    # Inverted index over the feed, keyed on the DataFrame index
+    index = BM25Index()
+    index.add_many(social_updates_df.index, social_updates_df['message'])
+    return index
+
+@st.cache_resource
+def get_embedding_store(social_updates_df):
+    # Memory-mapped vectors, one directory per version of the feed
+    version = pd.util.hash_pandas_object(social_updates_df, index=True).sum()
+    embedder = HashingEmbedder()
+    path = os.path.join('.cache', 'embeddings', f'{version:x}')
+    store = EmbeddingStore.from_frame(path, social_updates_df, embedder)
+    # Every published feed gets a directory; drop the ones no version uses any more
+    prune_stores(os.path.dirname(path), keep=path)
+    return embedder, store
+
+def retrieve_context(query, social_updates_df, top_k=8, mode="keyword"):
+    """Top-k social updates for the query (BM25 or semantic), joined for the prompt"""
+    start = time.perf_counter()
+    live_feed = get_live_feed()
+    if live_feed is not None:
+        # The live buffer keeps its own index up to date as updates arrive
+        if mode == "semantic":
+            hits = live_feed.semantic_search(live_feed.embedder.embed([query])[0], k=top_k)
+            hits = [(seq, score) for seq, score in hits if score > 0.1]
+        else:
+            hits = live_feed.search(query, k=top_k)
+        messages = live_feed.messages([seq for seq, _ in hits])
+    elif mode == "semantic":
+        embedder, store = get_embedding_store(social_updates_df)
+        hits = store.search(embedder.embed([query])[0], k=top_k)
+        # Drop orthogonal/negative matches so unrelated updates stay out of the prompt
+        hits = [(doc_id, score) for doc_id, score in hits if score > 0.1]
+    else:
+        hits = get_update_index(social_updates_df).search(query, k=top_k)
+    if live_feed is None:
+        messages = social_updates_df.loc[[doc_id for doc_id, _ in hits], 'message'].tolist()
+    st.session_state.last_retrieval = {
+        'mode': mode,
+        'ms': (time.perf_counter() - start) * 1000,
+        'hits': len(hits)
+    }
+    return "\n".join(messages)
+
+CHAT_PARAMS = dict(
+    model="mixtral-8x7b-32768",
+    temperature=0.7,
+    max_tokens=500,
+    top_p=0.9
+)
+
+def stream_completion(messages, query, context):
+    """Yield answer chunks as they arrive; API errors end the stream with an error message"""
     try:
-        relevant_updates = social_updates_df[
-            social_updates_df['message'].str.contains('|'.join(query.split()), case=False, na=False)
-        ]
-        context = "\n".join(relevant_updates['message'].tolist())
+        yield from get_completion_cache().stream(groq_client, messages, query, context, **CHAT_PARAMS)
+    except Exception as e:
+        yield f"AI processing error: {str(e)}"
+
+def ai_response_html(text):
+    return f"""
+        <div class="ai-response">
+            <strong>ANTNA:</strong><br>{text}
+        </div>
+    """
+
+def render_ai_response(response, refresh_seconds=0.05):
+    """
+    Render a full answer, or stream chunks into the ai-response block as they
+    arrive. Records time-to-first-token in st.session_state.last_ttft_ms.
+    """
+    placeholder = st.empty()
+    chunks = [response] if isinstance(response, str) else response
+    start = time.perf_counter()
+    first_token_ms = None
+    last_render = 0.0
+    text = ""
+    try:
+        for chunk in chunks:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+            text += chunk
+            # Throttle redraws so long answers don't flood the websocket
+            if time.perf_counter() - last_render >= refresh_seconds:
+                placeholder.markdown(ai_response_html(text + "▌"), unsafe_allow_html=True)
+                last_render = time.perf_counter()
+    finally:
+        # A new query reruns the script and interrupts this loop; drop the upstream stream
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    placeholder.markdown(ai_response_html(text), unsafe_allow_html=True)
+    st.session_state.last_ttft_ms = first_token_ms
+    return text
+
+def process_query_with_rag_and_map(query, social_updates_df, shelters_df, retrieval_mode="keyword", stream=False):
+    folium = lazy_import('folium')
+    try:
+        context = retrieve_context(query, social_updates_df, mode=retrieval_mode)
         
         messages = [
             {"role": "system", "content": """You are ANTNA, an AI assistant for emergency management in Qatar. 
@@ -161,24 +474,26 @@ def process_query_with_rag_and_map(query, social_updates_df, shelters_df):
         
         response_text = ""
         try:
-            response = groq_client.chat.completions.create(
-                messages=messages,
-                model="mixtral-8x7b-32768",
-                temperature=0.7,
-                max_tokens=500,
-                top_p=0.9
-            )
-            response_text = response.choices[0].message.content
+            if stream:
+                response_text = stream_completion(messages, query, context)
+            else:
+                response_text = get_completion_cache().complete(
+                    groq_client, messages, query, context, **CHAT_PARAMS
+                )
         except Exception as e:
             response_text = f"AI processing error: {str(e)}"
 
         # If the query relates to medical supplies, show a map
         if "medical supplies" in query.lower():
             # Simulate user's current location (replace with actual user location if available)
-            user_location = [25.3548, 51.1839]  # Example: Doha city center
+            user_location = doha_locations["Doha City Center"]
             
-            # Find nearest shelter
-            nearest_shelter = find_nearest_shelter(shelters_df, user_location, query_type="medical supplies")
+            # Prefer the nearest shelter by drive time once the matrix is filled
+            quickest = get_travel_matrix(shelters_df).nearest_by_time("Doha City Center")
+            if quickest:
+                nearest_shelter = shelters_df[shelters_df['name'] == quickest[0][0]].iloc[0]
+            else:
+                nearest_shelter = find_nearest_shelter(shelters_df, user_location, query_type="medical supplies")
             
             try:
                 # Request route from ORS
@@ -186,16 +501,14 @@ def process_query_with_rag_and_map(query, social_updates_df, shelters_df):
                     (user_location[1], user_location[0]),  # (lon, lat) for user location
                     (nearest_shelter['lon'], nearest_shelter['lat'])  # (lon, lat) for shelter
                 ]
-                route = ors_client.directions(
-                    coordinates=coordinates,
+                route = get_route_cache().directions(
+                    ors_client,
+                    coordinates,
                     profile='driving-car',
-                    format='geojson',
                     radiuses=[1000, 1000]  # Increase search radius to 1000 meters
                 )
-                route_coords = route['features'][0]['geometry']['coordinates']
-                
-                # Convert coordinates for Folium (lon, lat) -> (lat, lon)
-                route_coords = [[coord[1], coord[0]] for coord in route_coords]
+                # Geometry is already (lat, lon) for Folium
+                route_coords = route['geometry']
             except Exception as e:
                 st.error(f"Error fetching route: {e}")
                 # Fallback to straight line
@@ -231,7 +544,7 @@ def process_query_with_rag_and_map(query, social_updates_df, shelters_df):
             
             # Display the map
             st.markdown("<h4>📍 Route to Nearest Shelter with Medical Supplies</h4>", unsafe_allow_html=True)
-            st_folium(m, width=600, height=400)
+            lazy_import('streamlit_folium').st_folium(m, width=600, height=400)
 
         return response_text
     except Exception as e:
@@ -239,38 +552,43 @@ def process_query_with_rag_and_map(query, social_updates_df, shelters_df):
 
 
 # Voice transcription function
-def process_voice_input(audio_bytes):
+def get_transcriber():
+    """Groq Whisper, or the offline stub when ANTNA_TRANSCRIBER=stub"""
+    if os.environ.get('ANTNA_TRANSCRIBER') == 'stub':
+        from fakes import StubTranscriber
+        return StubTranscriber(latency_s=0.3, seconds_per_audio_second=0.05)
+    return groq_client
+
+def process_voice_input(audio_bytes, chunked=True, max_chunk_seconds=20.0):
     if not audio_bytes:
         return None
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-        try:
-            temp_audio.write(audio_bytes)
-            temp_audio_path = temp_audio.name
-            
-            with open(temp_audio_path, 'rb') as audio_file:
-                response = groq_client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-large-v3"
-                )
-            return response.text
-        except Exception as e:
-            st.error(f"Transcription error: {str(e)}")
-            return None
-        finally:
-            try:
-                os.remove(temp_audio_path)
-            except:
-                pass
+    # Decoded, trimmed and re-encoded in memory; repeated clips come from the cache.
+    # Long recordings go up as parallel chunks, with the text shown as each one lands.
+    placeholder = st.empty()
+    text, stats = "", {}
+    try:
+        for text, stats in get_transcript_cache().transcribe_chunks(
+            get_transcriber(), audio_bytes, model="whisper-large-v3",
+            max_chunk_seconds=max_chunk_seconds if chunked else None
+        ):
+            if stats.get('chunks', 1) > 1:
+                placeholder.info(f"🎙️ ({stats['done']}/{stats['chunks']}) {text}")
+    except Exception as e:
+        st.error(f"Transcription error: {str(e)}")
+        return None
+    finally:
+        placeholder.empty()
+    st.session_state.last_transcription = stats
+    if not text:
+        st.warning("No speech detected, please try again")
+        return None
+    return text
 
 # RAG simulation
-def process_query_with_rag(query, social_updates_df):
+def process_query_with_rag(query, social_updates_df, retrieval_mode="keyword", stream=False):
     try:
-        relevant_updates = social_updates_df[
-            social_updates_df['message'].str.contains('|'.join(query.split()), case=False, na=False)
-        ]
-        
-        context = "\n".join(relevant_updates['message'].tolist())
+        context = retrieve_context(query, social_updates_df, mode=retrieval_mode)
         
         messages = [
             {"role": "system", "content": """You are ANTNA, an AI assistant for emergency management in Qatar. 
@@ -279,14 +597,11 @@ def process_query_with_rag(query, social_updates_df):
         ]
         
         try:
-            response = groq_client.chat.completions.create(
-                messages=messages,
-                model="mixtral-8x7b-32768",
-                temperature=0.7,
-                max_tokens=500,
-                top_p=0.9
+            if stream:
+                return stream_completion(messages, query, context)
+            return get_completion_cache().complete(
+                groq_client, messages, query, context, **CHAT_PARAMS
             )
-            return response.choices[0].message.content
         except Exception as e:
             return f"AI processing error: {str(e)}"
             
@@ -294,8 +609,13 @@ def process_query_with_rag(query, social_updates_df):
         return f"Error processing query: {str(e)}"
 
 def main():
-    # Generate data
-    alerts_df, shelters_df, resources_df, social_updates_df = generate_data()
+    # Load data (admin-published tables when available)
+    versions_key, (alerts_df, shelters_df, resources_df, social_updates_df) = load_app_data()
+    registry = build_facility_registry(versions_key)
+    live_feed = get_live_feed()
+    if live_feed is not None:
+        # Seed and admin-published updates join the live buffer once per version
+        live_feed.sync_frame(versions_key, social_updates_df)
 
     # Sidebar
     with st.sidebar:
@@ -306,26 +626,45 @@ def main():
             </div>
         """, unsafe_allow_html=True)
         
+        # Keyword (BM25) or semantic retrieval, side by side for comparison
+        retrieval_choice = st.radio(
+            "Retrieval",
+            options=["Keyword (BM25)", "Semantic"],
+            horizontal=True,
+            key="retrieval_mode"
+        )
+        retrieval_mode = "semantic" if retrieval_choice == "Semantic" else "keyword"
+        
+        stream_responses = st.toggle("Stream responses", value=True, key="stream_responses")
+        
         # Voice Assistant
         st.subheader("🎤 Voice Input")
-        audio_bytes = audio_recorder(
+        # The recorder component is imported the first time the sidebar draws it
+        audio_bytes = lazy_import('audio_recorder_streamlit').audio_recorder(
             text="",  # Minimal text
             recording_color="#00ff9d",
             neutral_color="#333333"
         )
+        split_recordings = st.toggle("Split long recordings", value=True, key="split_recordings",
+                                     help="Transcribe long reports in parallel chunks, showing text as it arrives")
         
         if audio_bytes:
             with st.spinner("Processing voice..."):
-                transcribed_text = process_voice_input(audio_bytes)
+                transcribed_text = process_voice_input(audio_bytes, chunked=split_recordings)
                 if transcribed_text:
                     st.info(f"You said: {transcribed_text}")
+                    stats = st.session_state.get('last_transcription') or {}
+                    if stats.get('cached'):
+                        st.caption("Transcript from cache")
+                    elif 'upload_bytes' in stats:
+                        st.caption(f"Uploaded {stats['upload_bytes'] / 1024:.0f} KB "
+                                   f"of {stats['input_bytes'] / 1024:.0f} KB recorded"
+                                   + (f" in {stats['chunks']} chunks" if stats.get('chunks', 1) > 1 else ""))
                     with st.spinner("Processing..."):
-                        response = process_query_with_rag(transcribed_text, social_updates_df)
-                        st.markdown(f"""
-                            <div class="ai-response">
-                                <strong>ANTNA:</strong><br>{response}
-                            </div>
-                        """, unsafe_allow_html=True)
+                        response = process_query_with_rag(
+                            transcribed_text, social_updates_df, retrieval_mode, stream=stream_responses
+                        )
+                        render_ai_response(response)
         
         user_query = st.text_input("💬 Ask ANTNA", placeholder="Type your question...")
         if user_query:
@@ -333,17 +672,24 @@ def main():
                 # Check if the query mentions medical supplies or something route-related
                 if "medical supplies" in user_query.lower():
                     # Call the map-generating function for medical supplies
-                    response = process_query_with_rag_and_map(user_query, social_updates_df, shelters_df)
+                    response = process_query_with_rag_and_map(
+                        user_query, social_updates_df, shelters_df, retrieval_mode, stream=stream_responses
+                    )
                 else:
                     # Call the standard RAG function for other queries
-                    response = process_query_with_rag(user_query, social_updates_df)
+                    response = process_query_with_rag(
+                        user_query, social_updates_df, retrieval_mode, stream=stream_responses
+                    )
                 
                 # Display the AI response
-                st.markdown(f"""
-                    <div class="ai-response">
-                        <strong>ANTNA:</strong><br>{response}
-                    </div>
-                """, unsafe_allow_html=True)
+                render_ai_response(response)
+                
+                retrieval = st.session_state.get('last_retrieval')
+                if retrieval:
+                    ttft = st.session_state.get('last_ttft_ms')
+                    st.caption(f"{retrieval['hits']} updates retrieved ({retrieval['mode']}) "
+                               f"in {retrieval['ms']:.1f} ms"
+                               + (f" · first token in {ttft:.0f} ms" if ttft is not None else ""))
 
     # Main tabs
     tab1, tab2, tab3, tab4 = st.tabs(["⚠️ Alerts", "🏥 Centers", "📱 Updates", "✅ Prep"])
@@ -351,73 +697,65 @@ def main():
     # Alerts Tab
     with tab1:
         st.markdown("<h2>⚠️ Active Alerts</h2>", unsafe_allow_html=True)
-        for _, alert in alerts_df.iterrows():
-            severity_color = {
-                "High": "🔴", 
-                "Medium": "🟡",
-                "Low": "🟢"
-            }.get(alert["severity"], "⚪")
-            
-            st.markdown(f"""
-                <div class="alert-box">
-                    <h3>{severity_color} {alert['type']} Alert</h3>
-                    <p>📍 <b>Location:</b> {alert['location']}</p>
-                    <p>🕒 <b>Time:</b> {alert['time']}</p>
-                    <p>⚠️ <b>Severity:</b> {alert['severity']}</p>
-                    <p>ℹ️ <b>Details:</b> {alert['description']}</p>
-                </div>
-            """, unsafe_allow_html=True)
+        # One page of cards per rerun, sent as a single element
+        render_feed(alerts_df, alert_cards_html, key="alerts", page_size=10,
+                    cursor_column='time', noun="alerts")
+        
+        with st.expander("🏥 Facilities near high-severity alerts"):
+            impact_radius = st.slider("Distance from alert area (km)", 1, 25, 10, key="impact_radius")
+            affected = build_impact_index(versions_key).facilities_near_alerts(impact_radius)
+            st.caption(f"{len(affected)} of {len(registry)} facilities within {impact_radius} km")
+            st.dataframe(
+                affected[['name', 'type', 'occupancy', 'alert', 'alert_location', 'distance_km', 'n_alerts']].head(500),
+                hide_index=True, use_container_width=True
+            )
     
     # Centers Tab
     # Centers Tab
     with tab2:
         st.markdown("<h2>🏥 Critical Locations</h2>", unsafe_allow_html=True)
         
-        # Get the data
-        _, shelters_df, resources_df, _ = generate_data()
-        
-        # Define common locations in Doha
-        doha_locations = {
-            "Doha City Center": [25.3548, 51.1839],
-            "West Bay": [25.3287, 51.5309],
-            "The Pearl": [25.3741, 51.5503],
-            "Katara Cultural Village": [25.3594, 51.5277],
-            "Hamad International Airport": [25.2608, 51.6138],
-            "Education City": [25.3149, 51.4400],
-            "Souq Waqif": [25.2867, 51.5333],
-            "Aspire Zone": [25.2684, 51.4481],
-            "Msheireb Downtown": [25.2897, 51.5335],
-            "Al Waab": [25.2590, 51.4782]
-        }
-        
         # Create subtabs
-        list_tab, map_tab = st.tabs(["📋 List View", "🗺️ Map View"])
+        list_tab, map_tab, plan_tab = st.tabs(["📋 List View", "🗺️ Map View", "🚌 Evacuation Plan"])
         
         # List View Tab
         with list_tab:
+            forecast = build_depletion_forecast(versions_key)
+            scenario = st.selectbox("Supply outlook scenario", list(SCENARIOS), key='forecast_scenario',
+                                    help="Arrival rate and consumption assumed for the hours left below")
+            outlook = forecast.frame(scenario)
+            
+            with st.expander("⏳ Running out first"):
+                soonest = forecast.soonest(scenario, n=10)
+                st.dataframe(soonest, hide_index=True, use_container_width=True,
+                             column_config={column: st.column_config.NumberColumn(format="%.0f h")
+                                            for column in forecast.resources + ['hours_left']})
+            
             # Create three columns for better spacing
             cols = st.columns(3)
-            for idx, location in shelters_df.iterrows():
+            for idx, location in enumerate(registry.frame.itertuples(index=False)):
+                hours = outlook.iloc[idx]
                 with cols[idx % 3]:
-                    resources = resources_df[resources_df['location'] == location['name']].iloc[0]
-                    occupancy = (location['current'] / location['capacity']) * 100
-                    
                     st.markdown(f"""
                         <div class="stats-box">
-                            <h3>{location['name']}</h3>
-                            <p>🏥 Type: {location['type']}</p>
-                            <p>📞 Contact: {location['contact']}</p>
-                            <p>👥 Occupancy: {location['current']}/{location['capacity']} 
-                            ({occupancy:.1f}%)</p>
-                            <p>💧 Water: {resources['water_supply']} units</p>
-                            <p>🍲 Food: {resources['food_supply']} units</p>
-                            <p>🏥 Medical: {resources['medical_kits']} kits</p>
-                            <p>🕒 Updated: {resources['last_updated']}</p>
+                            <h3>{location.name}</h3>
+                            <p>🏥 Type: {location.type}</p>
+                            <p>📞 Contact: {location.contact}</p>
+                            <p>👥 Occupancy: {location.current}/{location.capacity} 
+                            ({location.occupancy:.1f}%)</p>
+                            <p>💧 Water: {location.water_supply} units (~{format_hours(hours.get('water_supply'))})</p>
+                            <p>🍲 Food: {location.food_supply} units (~{format_hours(hours.get('food_supply'))})</p>
+                            <p>🏥 Medical: {location.medical_kits} kits (~{format_hours(hours.get('medical_kits'))})</p>
+                            <p>🛏️ Beds full in: {format_hours(hours.get('beds'))}</p>
+                            <p>🕒 Updated: {location.last_updated}</p>
                         </div>
                     """, unsafe_allow_html=True)
         
         # Map View Tab
         with map_tab:
+            # Imported here, after the alerts and sidebar are already on the page
+            folium = lazy_import('folium')
+            st_folium = lazy_import('streamlit_folium').st_folium
             # Location Details Block (Top)
             st.markdown("<div class='location-details-container'>", unsafe_allow_html=True)
             
@@ -427,11 +765,11 @@ def main():
             with col1:
                 location_type = st.selectbox(
                     "Filter by type",
-                    options=['All'] + list(shelters_df['type'].unique()),
+                    options=['All'] + registry.types,
                     key='map_type_filter'
                 )
             
-            filtered_df = shelters_df if location_type == 'All' else shelters_df[shelters_df['type'] == location_type]
+            filtered_df = registry.of_type(location_type)
             
             with col2:
                 selected_location = st.selectbox(
@@ -449,73 +787,49 @@ def main():
                 
             with col4:
                 show_route = st.checkbox("Show route", value=False)
+                cluster_markers = st.checkbox("Cluster markers", value=True, key='map_cluster')
+                only_in_view = st.checkbox("Only facilities in view", value=False, key='map_in_view')
             
-            # Get selected location details
-            location_info = shelters_df[shelters_df['name'] == selected_location].iloc[0]
-            resources_info = resources_df[resources_df['location'] == selected_location].iloc[0]
+            # Get selected location details (shelter and resources in one row)
+            location_info = registry.get(selected_location)
             
-            # Display compact location details with status
-            occupancy_percentage = (location_info['current'] / location_info['capacity']) * 100
-            status_class = (
-                "status-active" if occupancy_percentage < 60 
-                else "status-busy" if occupancy_percentage < 90 
-                else "status-full"
+            # Quickest shelter by drive time from the selected location
+            quickest = get_travel_matrix(shelters_df).nearest_by_time(
+                current_location, mask=registry.type_mask(location_type)
             )
             
             st.markdown(f"""
-                <div class="stats-box {status_class}">
+                <div class="stats-box {location_info['status_class']}">
                     <div style="display: flex; justify-content: space-between; align-items: top;">
                         <div style="flex: 2;">
                             <h3>{location_info['name']}</h3>
                             <p>🏥 Type: {location_info['type']} | 📞 {location_info['contact']}</p>
                             <p>👥 Occupancy: {location_info['current']}/{location_info['capacity']} 
-                            ({occupancy_percentage:.1f}%)</p>
-                            <p>💧 Water: {resources_info['water_supply']} units | 
-                            🍲 Food: {resources_info['food_supply']} units | 
-                            🏥 Medical: {resources_info['medical_kits']} kits</p>
+                            ({location_info['occupancy']:.1f}%)</p>
+                            <p>💧 Water: {location_info['water_supply']} units | 
+                            🍲 Food: {location_info['food_supply']} units | 
+                            🏥 Medical: {location_info['medical_kits']} kits</p>
                         </div>
                     </div>
                 </div>
             """, unsafe_allow_html=True)
             
-            # Map Block (Bottom)
-            m = folium.Map(
-                location=doha_locations[current_location],  # Center map on selected current location
-                zoom_start=12,
-                tiles="cartodbpositron"
-            )
+            if quickest:
+                st.caption(f"🚗 Quickest from {current_location}: {quickest[0][0]} "
+                           f"(~{quickest[0][1] / 60:.0f} min drive)")
             
-            # Add markers for all locations
-            for idx, location in filtered_df.iterrows():
-                color = {
-                    'Primary': 'red',
-                    'Secondary': 'blue'
-                }.get(location['type'], 'gray')
-                
-                occupancy = (location['current'] / location['capacity']) * 100
-                resources = resources_df[resources_df['location'] == location['name']].iloc[0]
-                
-                popup_content = f"""
-                    <div style="width: 200px">
-                        <h4>{location['name']}</h4>
-                        <p><b>Type:</b> {location['type']}</p>
-                        <p><b>Contact:</b> {location['contact']}</p>
-                        <p><b>Occupancy:</b> {occupancy:.1f}%</p>
-                        <p><b>Resources:</b></p>
-                        <ul>
-                            <li>Water: {resources['water_supply']} units</li>
-                            <li>Food: {resources['food_supply']} units</li>
-                            <li>Medical: {resources['medical_kits']} kits</li>
-                        </ul>
-                    </div>
-                """
-                
-                marker = folium.Marker(
-                    location=[location['lat'], location['lon']],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    icon=folium.Icon(color=color, icon='info-sign'),
-                )
-                marker.add_to(m)
+            with st.expander(f"📱 Updates near {location_info['name']}"):
+                nearby = updates_near(versions_key, location_info['lat'], location_info['lon'])
+                if nearby.empty:
+                    st.caption("No updates within 5 km")
+                else:
+                    st.markdown(update_cards_html(nearby), unsafe_allow_html=True)
+            
+            # Map Block (Bottom)
+            # Viewport filtering uses the bounds the map reported on the last rerun
+            view = st.session_state.get('map_view') if only_in_view else None
+            map_df = in_bounds(filtered_df, view['bounds']) if view else filtered_df
+            m = build_facility_map(map_df, doha_locations[current_location], clustered=cluster_markers)
             
             # Add routing if requested
             if show_route:
@@ -536,14 +850,14 @@ def main():
                         [location_info['lon'], location_info['lat']]  # Destination (lon, lat)
                     ]
                     
-                    route = ors_client.directions(
-                        coordinates=coordinates,
-                        profile='driving-car',
-                        format='geojson'
+                    route = get_route_cache().directions(
+                        ors_client,
+                        coordinates,
+                        profile='driving-car'
                     )
 
-                    # Extract and convert route coordinates
-                    route_coords = [[coord[1], coord[0]] for coord in route['features'][0]['geometry']['coordinates']]
+                    # Cached route geometry is already (lat, lon)
+                    route_coords = route['geometry']
                     
                     # Add route to map
                     folium.PolyLine(
@@ -557,9 +871,11 @@ def main():
                     # Fit map bounds to show route
                     m.fit_bounds([user_location, [location_info['lat'], location_info['lon']]])
                     
-                    # Show route details
-                    duration_minutes = route['features'][0]['properties']['segments'][0]['duration'] / 60
-                    distance_km = route['features'][0]['properties']['segments'][0]['distance'] / 1000
+                    # Show route details, from the precomputed matrix when available
+                    travel = get_travel_matrix(shelters_df).lookup(current_location, location_info['name'])
+                    duration_s, distance_m = travel if travel else (route['duration'], route['distance'])
+                    duration_minutes = duration_s / 60
+                    distance_km = distance_m / 1000
                     
                     st.markdown(f"""
                         <div class="route-info">
@@ -573,72 +889,95 @@ def main():
                     
                 except Exception as e:
                     st.error(f"Error calculating route: {str(e)}")
+                
+                cache_stats = get_route_cache().stats()
+                st.caption(
+                    f"Route cache: {cache_stats['hits_memory'] + cache_stats['hits_disk']} hits / "
+                    f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+                )
             
             # Display the map
-            st_folium(m, height=500)
+            if only_in_view:
+                # Pans and zooms rerun the script so the layer follows the view
+                map_view = st_folium(
+                    m, height=500, returned_objects=['bounds', 'center', 'zoom'],
+                    center=(view['center']['lat'], view['center']['lng']) if view else None,
+                    zoom=view['zoom'] if view else None
+                )
+                if map_view and map_view.get('bounds'):
+                    st.session_state.map_view = map_view
+                st.caption(f"{len(map_df)} of {len(filtered_df)} facilities in view")
+            else:
+                # Nothing is read back from the map, so panning doesn't rerun the app
+                st_folium(m, height=500, returned_objects=[])
+        
+        # Evacuation Plan Tab
+        with plan_tab:
+            st.caption("People from each zone are sent where total drive time is lowest, "
+                       "without going over any shelter's free beds, water or food")
+            zones = st.data_editor(
+                pd.DataFrame({'zone': list(doha_locations), 'people': 300}),
+                disabled=['zone'], hide_index=True, key='evacuation_zones',
+                column_config={'people': st.column_config.NumberColumn("People to move", min_value=0, step=50)}
+            )
+            matrix = get_travel_matrix(shelters_df)
+            planner = get_evacuation_planner(shelters_df, matrix.ready)
+            # Free places follow the latest occupancy and resource reports
+            free = pd.Series(free_places(registry.frame), index=registry.frame['name'].astype(str))
+            solve_start = time.perf_counter()
+            assignments, unassigned = planner.plan(
+                zones.set_index('zone')['people'].reindex(planner.origin_names).fillna(0).astype(int),
+                free.reindex(planner.shelter_names).fillna(0).astype(int)
+            )
+            solve_ms = (time.perf_counter() - solve_start) * 1000
+            
+            moved = int(assignments['people'].sum())
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Assigned", f"{moved:,}")
+            col2.metric("No place left", f"{int(unassigned.sum()):,}")
+            col3.metric("Average drive",
+                        f"{(assignments['people'] * assignments['drive_min']).sum() / moved:.0f} min" if moved else "–")
+            st.dataframe(assignments.sort_values(['origin', 'drive_min']), hide_index=True, use_container_width=True,
+                         column_config={'drive_min': st.column_config.NumberColumn("Drive (min)", format="%.0f")})
+            st.caption(f"{int(free.sum()):,} free places across {len(free)} facilities · solved in {solve_ms:.0f} ms"
+                       + ("" if matrix.ready else " · drive times still loading, using estimates"))
 
     # Inside Tab 3 (Social Updates)
     with tab3:
         st.markdown("<h2>📱 Live Updates</h2>", unsafe_allow_html=True)
         
-        col1, col2 = st.columns([2,3])
+        # Live buffer when ingestion is on, otherwise the indexed static feed
+        live_feed = get_live_feed()
+        update_store = live_feed if live_feed is not None else build_update_store(versions_key)
+        
+        col1, col2, col3 = st.columns([2,3,1])
         with col1:
-            min_trust_score = st.slider("Trust Score Filter", 0.0, 1.0, 0.7, 0.1)
+            min_trust_score = st.slider("Trust Score Filter", 0.0, 1.0, 0.7, 0.1,
+                                        help="Scored from account type, verification, engagement and "
+                                             "how many others report the same place at the same time")
         with col2:
             account_types = st.multiselect(
                 "Source Filter",
-                options=social_updates_df['account_type'].unique(),
-                default=social_updates_df['account_type'].unique()
+                options=update_store.account_types,
+                default=update_store.account_types
             )
+        with col3:
+            time_window = st.selectbox("Time window", options=list(UPDATE_WINDOWS), key="update_window")
         
-        # Filter updates
-        filtered_updates = social_updates_df[
-            (social_updates_df['trust_score'] >= min_trust_score) &
-            (social_updates_df['account_type'].isin(account_types))
-        ].sort_values(['timestamp', 'trust_score'], ascending=[False, False])
+        # Filter updates through the store's cached indexes; windows are a binary search
+        window_minutes = UPDATE_WINDOWS[time_window]
+        since = datetime.now() - timedelta(minutes=window_minutes) if window_minutes else None
+        filtered_updates = update_store.query(min_trust_score, account_types, since=since)
         
-        # Display updates
-        for _, update in filtered_updates.iterrows():
-            # Determine trust class and verification status
-            trust_class = {
-                True: "trust-high" if update['trust_score'] >= 0.9 else "trust-medium",
-                False: "trust-low"
-            }[update['trust_score'] >= 0.7]
-            
-            verification_badge = "verified" if update['verified'] else "unverified"
-            
-            # Select badge color based on account type and verification
-            badge_color = {
-                'Official': '#00ff9d',
-                'Healthcare': '#00ff9d',
-                'Emergency': '#00ff9d',
-                'Media': '#ffbe0b',
-                'Citizen': '#888888'
-            }.get(update['account_type'], '#888888')
-            
-            st.markdown(f"""
-                <div class='social-update {trust_class}'>
-                    <div class="update-header">
-                        <div class="account-info">
-                            <strong style="color: {badge_color}">{update['account_type']}</strong>
-                            <span class="username">{update['username']}</span>
-                            <span class="badge {verification_badge}">
-                                {' ✓' if update['verified'] else '✕'}
-                            </span>
-                        </div>
-                    </div>
-                    <div class="update-content">
-                        {update['message']}
-                    </div>
-                    <div class="update-meta">
-                        <span class="meta-item">📍 {update['location']}</span>
-                        <span class="meta-separator">|</span>
-                        <span class="meta-item">💯 Trust: {update['trust_score']:.2f}</span>
-                        <span class="meta-separator">|</span>
-                        <span class="meta-item">👥 {update['engagement']}</span>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+        if live_feed is not None:
+            stats = live_feed.stats
+            st.caption(f"🔴 Live: {len(live_feed)} updates buffered · {stats['duplicates']} duplicates dropped · "
+                       f"{stats['invalid']} invalid · last batch at {stats['last_batch_per_second']:,.0f} msg/s")
+        
+        # Display updates, one page at a time
+        render_feed(filtered_updates, update_cards_html, key="updates", page_size=25,
+                    cursor_column='timestamp', filters=(min_trust_score, tuple(account_types), time_window),
+                    noun="updates")
 
 
     
@@ -711,5 +1050,13 @@ def main():
                 </div>
             """, unsafe_allow_html=True)
 
+    # Cold start / rerun time against the budget, also written to the server log
+    timing = run_timer.finish()
+    if timing['cold']:
+        st.sidebar.caption(f"⏱️ Cold start {timing['run_ms']:.0f} ms "
+                           f"(deferred imports {timing['import_ms']:.0f} ms, budget {timing['budget_ms']:.0f} ms)")
+    else:
+        st.sidebar.caption(f"⏱️ Rerun {timing['run_ms']:.0f} ms (budget {timing['budget_ms']:.0f} ms)")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+from startup import lazy_import
+
+TYPE_COLORS = {
+    'Primary': 'red',
+    'Secondary': 'blue'
+}
+
+POPUP_FIELDS = ['name', 'type', 'contact', 'occupancy', 'water_supply', 'food_supply', 'medical_kits']
+POPUP_ALIASES = ['Facility', 'Type', 'Contact', 'Occupancy (%)', 'Water (units)', 'Food (units)', 'Medical (kits)']
+
+
+def in_bounds(df, bounds, pad=0.1):
+    """
+    Rows inside a Leaflet bounds dict (as returned by st_folium), widened by
+    `pad` of the view on every side so small pans don't need a rerun to fill in.
+    """
+    if not bounds or not bounds.get('_southWest') or not bounds.get('_northEast'):
+        return df
+    south, west = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+    north, east = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+    pad_lat, pad_lon = (north - south) * pad, (east - west) * pad
+    lat = df['lat'].to_numpy()
+    lon = df['lon'].to_numpy()
+    mask = ((lat >= south - pad_lat) & (lat <= north + pad_lat)
+            & (lon >= west - pad_lon) & (lon <= east + pad_lon))
+    return df[mask]
+
+
+def facility_geojson(frame):
+    """FeatureCollection with one Point per registry row and the popup fields as properties"""
+    properties = frame[POPUP_FIELDS].assign(occupancy=frame['occupancy'].round(1)).astype(object)
+    properties = properties.where(properties.notna(), None)
+    # ~1 m precision is plenty for a marker and keeps the payload small
+    coordinates = np.column_stack([frame['lon'].to_numpy(float), frame['lat'].to_numpy(float)]).round(5).tolist()
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': point}, 'properties': props}
+            for point, props in zip(coordinates, properties.to_dict('records'))
+        ],
+    }
+
+
+def add_clustered_facilities(m, frame):
+    """
+    Add facilities as GeoJSON inside a client-side marker cluster, one layer
+    per facility type so each layer has a single fixed style. Popups are
+    filled from feature properties when a marker is clicked, so no
+    per-facility HTML is generated up front.
+    """
+    folium = lazy_import('folium')
+    plugins = lazy_import('folium.plugins')
+    cluster = plugins.MarkerCluster(name="Facilities", options={'chunkedLoading': True}).add_to(m)
+    for facility_type, group in frame.groupby('type', sort=False, observed=True):
+        color = TYPE_COLORS.get(facility_type, 'gray')
+        style = {'color': color, 'fillColor': color, 'fillOpacity': 0.8, 'weight': 1}
+        folium.GeoJson(
+            facility_geojson(group),
+            name=str(facility_type),
+            marker=folium.CircleMarker(radius=8),
+            style_function=lambda feature, style=style: style,
+            tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False),
+            popup=folium.GeoJsonPopup(fields=POPUP_FIELDS, aliases=POPUP_ALIASES, max_width=300),
+        ).add_to(cluster)
+    return cluster
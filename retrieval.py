@@ -0,0 +1,97 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do for from has have how i in is it me my near
+nearest of on or the there to was what when where which who why will with you
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords; punctuation never reaches a regex"""
+    return [t for t in TOKEN_PATTERN.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index over short messages with Okapi BM25 scoring.
+
+    Postings map term -> {doc_id: term frequency}, so a query only touches the
+    documents that contain its terms instead of scanning the whole feed.
+    Documents can be added and removed one at a time as the feed changes.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}
+        self.doc_len = {}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_len
+
+    def add(self, doc_id, text):
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.doc_len[doc_id] = length
+        self.total_len += length
+
+    def add_many(self, doc_ids, texts):
+        for doc_id, text in zip(doc_ids, texts):
+            self.add(doc_id, text)
+
+    def remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id)
+
+    def search(self, query, k=10):
+        """Return up to k (doc_id, score) pairs, best first"""
+        n_docs = len(self.doc_len)
+        if n_docs == 0:
+            return []
+        avg_len = self.total_len / n_docs or 1.0
+
+        terms = []
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting:
+                df = len(posting)
+                terms.append((math.log(1 + (n_docs - df + 0.5) / (df + 0.5)), posting))
+        # Rare terms first; once the k-th best score beats what the remaining
+        # terms could add, common terms only rescore the existing candidates
+        terms.sort(key=lambda item: item[0], reverse=True)
+        remaining = [idf * (self.k1 + 1) for idf, _ in terms]
+        for i in range(len(remaining) - 2, -1, -1):
+            remaining[i] += remaining[i + 1]
+
+        scores = defaultdict(float)
+        for i, (idf, posting) in enumerate(terms):
+            if len(scores) >= k and heapq.nlargest(k, scores.values())[-1] >= remaining[i]:
+                doc_ids = [doc_id for doc_id in scores if doc_id in posting]
+            else:
+                doc_ids = posting
+            for doc_id in doc_ids:
+                tf = posting[doc_id]
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
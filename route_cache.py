@@ -0,0 +1,53 @@
+import json
+
+from cache import TieredCache
+
+
+class RouteCache(TieredCache):
+    """Two-tier cache in front of ors_client.directions.
+
+    Routes are keyed on the profile, the request options and the coordinates
+    rounded to `precision` decimals (4 decimals is roughly 11 m), so nearby
+    clicks reuse the same entry. Only the parts the app draws are stored:
+    geometry as [lat, lon] pairs, duration (s) and distance (m).
+    """
+
+    def __init__(self, path=None, memory_size=256, ttl_seconds=24 * 3600,
+                 max_disk_entries=10000, precision=4):
+        super().__init__(path, memory_size, ttl_seconds, max_disk_entries, table='routes')
+        self.precision = precision
+
+    def make_key(self, coordinates, profile, **options):
+        coords = ";".join(
+            f"{round(float(lon), self.precision)},{round(float(lat), self.precision)}"
+            for lon, lat in coordinates
+        )
+        return f"{profile}|{coords}|{json.dumps(options, sort_keys=True)}"
+
+    def directions(self, client, coordinates, profile='driving-car', **options):
+        """
+        Return {'geometry', 'duration', 'distance'} for a route, calling
+        client.directions only on a cache miss. Errors from the client are
+        raised as-is and nothing is cached.
+        """
+        key = self.make_key(coordinates, profile, **options)
+        route = self.get(key)
+        if route is not None:
+            return route
+
+        response = client.directions(
+            coordinates=coordinates,
+            profile=profile,
+            format='geojson',
+            **options
+        )
+        feature = response['features'][0]
+        summary = feature['properties']['segments'][0]
+        route = {
+            # (lon, lat) -> (lat, lon) for Folium
+            'geometry': [[coord[1], coord[0]] for coord in feature['geometry']['coordinates']],
+            'duration': summary['duration'],
+            'distance': summary['distance'],
+        }
+        self.put(key, route)
+        return route
@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, broadcasting over numpy arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+class ShelterIndex:
+    """Great-circle top-k index over shelter coordinates.
+
+    Shelters are stored as unit vectors on the sphere, so the closest shelters
+    are the ones with the largest dot product. A batch of user locations is a
+    single matrix product per chunk, followed by argpartition for the top-k.
+    Build it once per version of shelters_df and reuse it across reruns.
+    """
+
+    def __init__(self, shelters_df, lat_col='lat', lon_col='lon'):
+        self.shelters = shelters_df.reset_index(drop=True)
+        self.lat = self.shelters[lat_col].to_numpy(dtype=np.float64)
+        self.lon = self.shelters[lon_col].to_numpy(dtype=np.float64)
+        self._xyz = _unit_vectors(self.lat, self.lon)
+
+    def __len__(self):
+        return len(self.shelters)
+
+    def _candidates(self, shelter_type=None, min_free_capacity=None, mask=None):
+        keep = np.ones(len(self.shelters), dtype=bool)
+        if shelter_type is not None:
+            types = [shelter_type] if isinstance(shelter_type, str) else list(shelter_type)
+            keep &= self.shelters['type'].isin(types).to_numpy()
+        if min_free_capacity is not None:
+            free = (self.shelters['capacity'] - self.shelters['current']).to_numpy()
+            keep &= free >= min_free_capacity
+        if mask is not None:
+            keep &= np.asarray(mask, dtype=bool)
+        return np.flatnonzero(keep)
+
+    def query(self, points, k=1, shelter_type=None, min_free_capacity=None,
+              mask=None, chunk_size=4096):
+        """
+        Return (distances_km, indices) of the k nearest shelters for each point.
+
+        points is an (n, 2) array of [lat, lon]. Both results have shape (n, k)
+        and are sorted nearest first; indices refer to rows of self.shelters.
+        If fewer than k shelters pass the filters, missing slots hold -1 / inf.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        n = len(points)
+        distances = np.full((n, k), np.inf)
+        indices = np.full((n, k), -1, dtype=np.int64)
+
+        candidates = self._candidates(shelter_type, min_free_capacity, mask)
+        if n == 0 or len(candidates) == 0:
+            return distances, indices
+
+        kk = min(k, len(candidates))
+        cand_xyz = self._xyz[candidates]
+        # Keep the similarity block around a few million cells
+        chunk_size = max(1, min(chunk_size, 4_000_000 // len(candidates)))
+        for start in range(0, n, chunk_size):
+            chunk = points[start:start + chunk_size]
+            sims = _unit_vectors(chunk[:, 0], chunk[:, 1]) @ cand_xyz.T
+            if kk < len(candidates):
+                top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+            else:
+                top = np.broadcast_to(np.arange(kk), (len(chunk), kk))
+            idx = candidates[top]
+            # Exact distances for the selected shelters only
+            dist = haversine_km(chunk[:, [0]], chunk[:, [1]], self.lat[idx], self.lon[idx])
+            order = np.argsort(dist, axis=1)
+            distances[start:start + len(chunk), :kk] = np.take_along_axis(dist, order, axis=1)
+            indices[start:start + len(chunk), :kk] = np.take_along_axis(idx, order, axis=1)
+        return distances, indices
+
+    def nearest(self, user_location, k=1, **filters):
+        """Return the k nearest shelters to one [lat, lon] as a DataFrame with a distance_km column"""
+        distances, indices = self.query([user_location], k=k, **filters)
+        found = indices[0] >= 0
+        result = self.shelters.iloc[indices[0][found]].copy()
+        result['distance_km'] = distances[0][found]
+        return result
+
+    def nearest_batch(self, user_locations, **filters):
+        """Nearest shelter for every [lat, lon] in one vectorized call"""
+        distances, indices = self.query(user_locations, k=1, **filters)
+        return pd.DataFrame({
+            'shelter_index': indices[:, 0],
+            'name': np.where(indices[:, 0] >= 0,
+                             self.shelters['name'].to_numpy()[indices[:, 0]], None),
+            'distance_km': distances[:, 0],
+        })
+
+
+KM_PER_DEG_LAT = 111.32
+
+# Rough extent of each named area, so "Doha" covers more than its centre point
+PLACE_RADII_KM = {'Doha': 8.0, 'Al Rayyan': 6.0, 'Al Shamal': 6.0, 'Dukhan': 5.0}
+DEFAULT_PLACE_RADIUS_KM = 3.0
+COUNTRY_RADIUS_KM = 100.0
+
+
+def resolve_locations(names, places=None):
+    """
+    (lat, lon, radius_km) arrays for location names like "Al Wakrah".
+
+    Matching ignores case, then falls back to the first known place named
+    inside the string ("Al Wakrah Port"). "Qatar" covers the whole country.
+    Unknown names get NaN. Each distinct name is resolved once.
+    """
+    from locations import QATAR_LOCATIONS, QATAR_CENTER
+    places = QATAR_LOCATIONS if places is None else places
+    by_lower = {name.lower(): name for name in places}
+    # Longest names first so "Al Rayyan" isn't claimed by a shorter match
+    by_length = sorted(by_lower, key=len, reverse=True)
+
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object).fillna('').astype(str).str.strip().str.lower())
+    resolved = np.full((len(uniques) + 1, 3), np.nan)
+    for i, name in enumerate(uniques):
+        place = by_lower.get(name) or next((by_lower[p] for p in by_length if p in name), None)
+        if place is not None:
+            resolved[i] = [*places[place], PLACE_RADII_KM.get(place, DEFAULT_PLACE_RADIUS_KM)]
+        elif 'qatar' in name:
+            resolved[i] = [*QATAR_CENTER, COUNTRY_RADIUS_KM]
+    # factorize codes missing values as -1, which picks the NaN row at the end
+    out = resolved[codes]
+    return out[:, 0], out[:, 1], out[:, 2]
+
+
+class GridIndex:
+    """Points bucketed into square cells of about `cell_km`, for radius joins.
+
+    Cells come from an equirectangular projection around the points' mean
+    latitude and are packed into int64 keys, like a fixed-precision geohash.
+    Points are sorted by key, so a cell is a contiguous slice. A radius query
+    only looks at the cells its circle can touch, then checks exact
+    great-circle distances. Points with NaN coordinates are left out.
+    """
+
+    def __init__(self, lat, lon, cell_km=2.0):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_km = cell_km
+        valid = np.isfinite(self.lat) & np.isfinite(self.lon)
+        ref_lat = self.lat[valid].mean() if valid.any() else 0.0
+        self._dlat = cell_km / KM_PER_DEG_LAT
+        self._dlon = cell_km / (KM_PER_DEG_LAT * max(np.cos(np.radians(ref_lat)), 0.01))
+
+        points = np.flatnonzero(valid)
+        keys = self._keys(*self._cells(self.lat[points], self.lon[points]))
+        order = np.argsort(keys, kind='stable')
+        self._points = points[order]
+        self._cell_keys, self._starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._ends = self._starts + counts
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cells(self, lat, lon):
+        return np.floor(lat / self._dlat).astype(np.int64), np.floor(lon / self._dlon).astype(np.int64)
+
+    @staticmethod
+    def _keys(rows, cols):
+        return (rows << 32) + (cols & 0xFFFFFFFF)
+
+    def within(self, lat, lon, radius_km):
+        """
+        All (query, point) pairs closer than the query's radius, for a batch
+        of query points. Returns (query_idx, point_idx, distance_km) arrays.
+        radius_km may be a scalar or one radius per query.
+        """
+        lat, lon, radius = np.broadcast_arrays(np.atleast_1d(np.asarray(lat, dtype=np.float64)),
+                                               np.atleast_1d(np.asarray(lon, dtype=np.float64)),
+                                               np.atleast_1d(np.asarray(radius_km, dtype=np.float64)))
+        queries = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon) & np.isfinite(radius))
+        empty = np.empty(0, dtype=np.int64)
+        if len(queries) == 0 or len(self._points) == 0:
+            return empty, empty, np.empty(0)
+
+        # Cells a circle can reach, measured at the query that's furthest from the equator
+        max_radius = radius[queries].max()
+        span_lat = int(np.ceil(max_radius / (self._dlat * KM_PER_DEG_LAT)))
+        cos_lat = max(np.cos(np.radians(np.abs(lat[queries]).max())), 0.01)
+        span_lon = int(np.ceil(max_radius / (self._dlon * KM_PER_DEG_LAT * cos_lat)))
+        d_rows, d_cols = np.meshgrid(np.arange(-span_lat, span_lat + 1), np.arange(-span_lon, span_lon + 1),
+                                     indexing='ij')
+        rows, cols = self._cells(lat[queries], lon[queries])
+        keys = self._keys(rows[:, None] + d_rows.ravel(), cols[:, None] + d_cols.ravel())
+
+        slot = np.minimum(np.searchsorted(self._cell_keys, keys), len(self._cell_keys) - 1)
+        hit = self._cell_keys[slot] == keys
+        query_of_cell = np.broadcast_to(queries[:, None], keys.shape)[hit]
+        starts, ends = self._starts[slot[hit]], self._ends[slot[hit]]
+
+        # Expand each (query, cell) hit into the cell's points without a Python loop
+        counts = ends - starts
+        query_idx = np.repeat(query_of_cell, counts)
+        within_cell = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        point_idx = self._points[np.repeat(starts, counts) + within_cell]
+
+        distance = haversine_km(lat[query_idx], lon[query_idx], self.lat[point_idx], self.lon[point_idx])
+        keep = distance <= radius[query_idx]
+        return query_idx[keep], point_idx[keep], distance[keep]
+
+
+class ImpactIndex:
+    """Spatial joins between alerts, facilities and updates, built once per data version.
+
+    Alerts and updates only name a place, so they are resolved to a centre
+    and an area radius. Distances from an area are measured to its edge,
+    and are 0 inside it. Facilities go into a GridIndex. Updates are grouped
+    by place name, so "updates near a shelter" becomes "places within R of
+    the shelter", then those places' rows.
+    """
+
+    def __init__(self, alerts_df, facilities_df, updates_df, cell_km=2.0):
+        self.alerts = alerts_df.reset_index(drop=True)
+        self.facilities = facilities_df.reset_index(drop=True)
+        self.updates = updates_df.reset_index(drop=True)
+        self.alert_lat, self.alert_lon, self.alert_radius = resolve_locations(self.alerts['location'])
+        self.facility_grid = GridIndex(self.facilities['lat'], self.facilities['lon'], cell_km)
+
+        codes, self.places = pd.factorize(self.updates['location'].astype(str))
+        self.place_lat, self.place_lon, self.place_radius = resolve_locations(self.places)
+        self.place_grid = GridIndex(self.place_lat, self.place_lon, cell_km)
+        # Row positions per place, newest first
+        newest_first = np.argsort(pd.to_datetime(self.updates['timestamp'], format='mixed').to_numpy(),
+                                  kind='stable')[::-1]
+        self._rank = np.empty(len(newest_first), dtype=np.int64)
+        self._rank[newest_first] = np.arange(len(newest_first))
+        by_place = newest_first[np.argsort(codes[newest_first], kind='stable')]
+        bounds = np.searchsorted(codes[by_place], np.arange(len(self.places) + 1))
+        self._place_rows = [by_place[bounds[i]:bounds[i + 1]] for i in range(len(self.places))]
+
+    def facilities_near_alerts(self, radius_km=10.0, severities=('High',)):
+        """
+        Facilities within radius_km of the area of any alert with one of the
+        given severities, nearest first. One row per facility, with its
+        nearest alert and how many alerts reach it.
+        """
+        alerts = np.flatnonzero(self.alerts['severity'].isin(list(severities)).to_numpy())
+        # Alerts only name a handful of areas: join each distinct area once
+        areas, first_alert, alerts_per_area = np.unique(
+            np.column_stack([self.alert_lat[alerts], self.alert_lon[alerts], self.alert_radius[alerts]]),
+            axis=0, return_index=True, return_counts=True)
+        area, facility, distance = self.facility_grid.within(areas[:, 0], areas[:, 1], areas[:, 2] + radius_km)
+        distance = np.maximum(distance - areas[area, 2], 0)
+
+        # Nearest area per facility: sort by (facility, distance), take each facility's first pair
+        order = np.lexsort((distance, facility))
+        facilities, first = np.unique(facility[order], return_index=True)
+        n_alerts = np.bincount(facility, weights=alerts_per_area[area], minlength=len(self.facilities))
+        nearest = order[first]
+        by_distance = np.argsort(distance[nearest], kind='stable')
+        facilities, nearest = facilities[by_distance], nearest[by_distance]
+
+        result = self.facilities.iloc[facilities].reset_index(drop=True)
+        alerts_hit = self.alerts.iloc[alerts[first_alert[area[nearest]]]]
+        result['alert'] = alerts_hit['type'].to_numpy()
+        result['severity'] = alerts_hit['severity'].to_numpy()
+        result['alert_location'] = alerts_hit['location'].to_numpy()
+        result['distance_km'] = distance[nearest].round(2)
+        result['n_alerts'] = n_alerts[facilities].astype(np.int64)
+        return result
+
+    def places_near(self, lat, lon, radius_km=5.0):
+        """Update places whose area comes within radius_km of a point, nearest first"""
+        _, place, distance = self.place_grid.within(
+            lat, lon, radius_km + np.nanmax(self.place_radius, initial=0.0))
+        distance = np.maximum(distance - self.place_radius[place], 0)
+        keep = distance <= radius_km
+        place, distance = place[keep], distance[keep]
+        order = np.argsort(distance, kind='stable')
+        return pd.DataFrame({'location': self.places[place[order]], 'distance_km': distance[order]})
+
+    def updates_near(self, lat, lon, radius_km=5.0, limit=None):
+        """Updates posted about places within radius_km of a point, newest first"""
+        near = self.places_near(lat, lon, radius_km)
+        if near.empty:
+            return self.updates.iloc[:0].assign(distance_km=np.empty(0))
+        codes = self.places.get_indexer(near['location'])
+        rows = np.concatenate([self._place_rows[code] for code in codes])
+        distance = np.repeat(near['distance_km'].to_numpy(), [len(self._place_rows[code]) for code in codes])
+        order = np.argsort(self._rank[rows], kind='stable')[:limit]
+        return self.updates.iloc[rows[order]].assign(distance_km=distance[order]).reset_index(drop=True)
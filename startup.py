@@ -0,0 +1,80 @@
+"""
+Cold-start accounting for the Streamlit entry points.
+
+Heavy packages (folium, streamlit_folium, audio_recorder_streamlit, the API
+SDKs) go through lazy_import at the point of use. A process pays for them
+the first time a feature needs them, after the first elements have already
+been sent to the browser. This module stays in sys.modules across reruns,
+so it also knows whether a run is the process's first. RunTimer times one
+script run and logs it against a budget.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+from streamlit.logger import get_logger
+
+# Goes through Streamlit's log handler, so it shows in the server output
+logger = get_logger("antna.startup")
+
+PROCESS_START = time.perf_counter()
+COLD_START_BUDGET_MS = float(os.environ.get('ANTNA_COLD_START_BUDGET_MS', 3000))
+RERUN_BUDGET_MS = float(os.environ.get('ANTNA_RERUN_BUDGET_MS', 500))
+
+# First-import time per module in this process, in ms
+IMPORT_MS = {}
+_lock = threading.Lock()
+_runs = 0
+
+
+def lazy_import(name):
+    """importlib.import_module, timing the first import of each module"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        IMPORT_MS.setdefault(name, (time.perf_counter() - start) * 1000)
+    return module
+
+
+class RunTimer:
+    """Wall time and deferred-import time of one script run"""
+
+    def __init__(self, name):
+        global _runs
+        self.name = name
+        self.start = time.perf_counter()
+        with _lock:
+            self.cold = _runs == 0
+            _runs += 1
+            self._imported_before = set(IMPORT_MS)
+
+    def finish(self):
+        """Log the run against its budget and return the numbers for display"""
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        with _lock:
+            imports = {name: ms for name, ms in IMPORT_MS.items() if name not in self._imported_before}
+        budget_ms = COLD_START_BUDGET_MS if self.cold else RERUN_BUDGET_MS
+        stats = {
+            'cold': self.cold,
+            'run_ms': elapsed_ms,
+            # On a cold start, include the time from this module's import (server start) to the script
+            'since_process_start_ms': (time.perf_counter() - PROCESS_START) * 1000 if self.cold else None,
+            'import_ms': sum(imports.values()),
+            'imports': imports,
+            'budget_ms': budget_ms,
+            'over_budget': elapsed_ms > budget_ms,
+        }
+        detail = ", ".join(f"{name} {ms:.0f} ms" for name, ms in sorted(imports.items(), key=lambda i: -i[1]))
+        message = (f"{self.name} {'cold start' if self.cold else 'rerun'}: {elapsed_ms:.0f} ms "
+                   f"(budget {budget_ms:.0f} ms), deferred imports {stats['import_ms']:.0f} ms"
+                   + (f" [{detail}]" if detail else ""))
+        if stats['over_budget']:
+            logger.warning(message)
+        elif self.cold:
+            logger.info(message)
+        return stats
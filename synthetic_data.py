@@ -0,0 +1,226 @@
+"""
+Deterministic large-scale versions of the frames built by main.generate_data.
+
+Every generator takes a seed and produces the same rows for the same
+arguments, chunk by chunk, so a 10M-row feed can be written without holding
+it in memory and regenerated exactly for a later benchmark run.
+
+    python synthetic_data.py --facilities 100000 --updates 10000000 --out data/synthetic
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from locations import QATAR_LOCATIONS
+
+LOCATION_NAMES = list(QATAR_LOCATIONS)
+LOCATION_COORDS = np.array([QATAR_LOCATIONS[name] for name in LOCATION_NAMES])
+
+ALERT_TYPES = ['Sandstorm', 'Heat Wave', 'Flash Flood', 'Dust Storm', 'Strong Winds']
+ALERT_DESCRIPTIONS = {
+    'Sandstorm': 'Severe sandstorm approaching with reduced visibility',
+    'Heat Wave': 'Extreme temperatures expected to reach 48°C',
+    'Flash Flood': 'Heavy rainfall may cause local flooding',
+    'Dust Storm': 'Moderate dust storm affecting visibility',
+    'Strong Winds': 'Strong winds expected up to 40km/h',
+}
+SEVERITIES = np.array(['High', 'Medium', 'Low'])
+
+FACILITY_KINDS = ['Sports Arena', 'Stadium', 'School', 'Community Centre', 'Health Centre', 'Mall']
+
+ACCOUNT_TYPES = np.array(['Official', 'Citizen', 'Emergency', 'Healthcare', 'Media'])
+ACCOUNT_WEIGHTS = np.array([0.25, 0.40, 0.12, 0.08, 0.15])
+# Mean trust and verification rate per account type, in ACCOUNT_TYPES order
+ACCOUNT_TRUST = np.array([0.96, 0.62, 0.96, 0.95, 0.90])
+ACCOUNT_VERIFIED = np.array([0.98, 0.05, 0.95, 0.95, 0.80])
+EMERGENCY_TYPES = np.array(['Sandstorm', 'Heat Wave', 'Flood', 'Multiple'])
+MESSAGE_TEMPLATES = {
+    'Sandstorm': ['Severe sandstorm warning for {loc} region. Visibility reduced to 500m.',
+                  'Heavy sand in {loc} area. Roads barely visible.',
+                  'Traffic diverted on {loc} Road due to poor visibility.'],
+    'Heat Wave': ['Temperature hitting 47°C in {loc}. Multiple cases of heat exhaustion.',
+                  'Extreme heat warning: Temperature to reach 48°C in {loc}.',
+                  'Cooling centres open in {loc} for residents without power.'],
+    'Flood': ['Flash flood warning for {loc}. Emergency teams on high alert.',
+              'Storm drains being cleared in {loc} to prevent flooding.',
+              'Water rising on main roads in {loc}, avoid low-lying areas.'],
+    'Multiple': ['Live updates: Multiple weather-related incidents across {loc}.',
+                 'Emergency teams deployed to {loc}. Shelter available.',
+                 '{loc} Hospital ready to receive emergency cases.'],
+}
+
+SOCIAL_UPDATE_COLUMNS = ['timestamp', 'source', 'account_type', 'username', 'message', 'location',
+                         'trust_score', 'verified', 'engagement', 'emergency_type']
+
+
+def _rng(seed, *stream):
+    # Independent, reproducible stream per (seed, table, chunk)
+    return np.random.default_rng([seed, *stream])
+
+
+def _timestamps(now, minutes_ago, fmt):
+    stamps = (np.datetime64(now.replace(microsecond=0), 's')
+              - minutes_ago.astype('timedelta64[m]')).astype('datetime64[s]')
+    if fmt == 'iso':
+        return stamps.astype(str)
+    return pd.to_datetime(stamps).strftime(fmt).to_numpy()
+
+
+def generate_alerts(n, seed=0, now=None):
+    """alerts_df schema: type, severity, location, time, description"""
+    rng = _rng(seed, 0)
+    now = now or datetime.now()
+    types = np.array(ALERT_TYPES)[rng.integers(0, len(ALERT_TYPES), n)]
+    return pd.DataFrame({
+        'type': types,
+        'severity': SEVERITIES[rng.choice(3, n, p=[0.3, 0.45, 0.25])],
+        'location': np.array(LOCATION_NAMES)[rng.integers(0, len(LOCATION_NAMES), n)],
+        'time': _timestamps(now, np.sort(rng.integers(0, 24 * 60, n)), '%Y-%m-%d %H:%M'),
+        'description': pd.Series(types).map(ALERT_DESCRIPTIONS).to_numpy(),
+    })
+
+
+def generate_facilities(n, seed=0, now=None):
+    """Return (shelters_df, resources_df) with main.py's schemas, joined on name/location"""
+    rng = _rng(seed, 1)
+    now = now or datetime.now()
+    district = rng.integers(0, len(LOCATION_NAMES), n)
+    kind = rng.integers(0, len(FACILITY_KINDS), n)
+    names = [f"{LOCATION_NAMES[d]} {FACILITY_KINDS[k]} {i:06d}" for i, (d, k) in enumerate(zip(district, kind))]
+    # Scatter facilities a few km around their district centre
+    lat = LOCATION_COORDS[district, 0] + rng.normal(0, 0.03, n)
+    lon = LOCATION_COORDS[district, 1] + rng.normal(0, 0.03, n)
+    capacity = rng.integers(2, 21, n) * 50
+    current = (capacity * rng.beta(2, 3, n)).astype(np.int64)
+
+    shelters_df = pd.DataFrame({
+        'name': names,
+        'capacity': capacity,
+        'current': current,
+        'lat': lat,
+        'lon': lon,
+        'type': np.where(rng.random(n) < 0.5, 'Primary', 'Secondary'),
+        'contact': [f'+974-4{i % 1000:03d}-{i // 1000 % 10000:04d}' for i in range(n)],
+    })
+    resources_df = pd.DataFrame({
+        'location': names,
+        'water_supply': (capacity * rng.uniform(0.8, 1.6, n)).astype(np.int64),
+        'food_supply': (capacity * rng.uniform(0.6, 1.3, n)).astype(np.int64),
+        'medical_kits': (capacity * rng.uniform(0.03, 0.08, n)).astype(np.int64),
+        'generators': (capacity // 80 + rng.integers(0, 4, n)).astype(np.int64),
+        'beds': (capacity * rng.uniform(0.5, 0.8, n)).astype(np.int64),
+        'last_updated': _timestamps(now, rng.integers(0, 180, n), '%Y-%m-%d %H:%M'),
+    })
+    return shelters_df, resources_df
+
+
+def _message_table():
+    # Every (emergency type, template, location) message, rendered once and
+    # laid out so row (e * n_templates + t) * n_locations + l is that combo
+    messages = [template.format(loc=location)
+                for emergency in EMERGENCY_TYPES
+                for template in MESSAGE_TEMPLATES[emergency]
+                for location in LOCATION_NAMES]
+    return np.array(messages, dtype=object)
+
+
+def iter_social_updates(n, chunk_size=1_000_000, seed=0, now=None, n_users=50000):
+    """Yield social_updates_df-shaped chunks, newest first, totalling n rows"""
+    now = now or datetime.now()
+    messages = _message_table()
+    usernames = np.array([f'@user{i}' for i in range(n_users)], dtype=object)
+    n_templates = len(MESSAGE_TEMPLATES['Sandstorm'])
+    for chunk, start in enumerate(range(0, n, chunk_size)):
+        size = min(chunk_size, n - start)
+        rng = _rng(seed, 2, chunk)
+        account = rng.choice(len(ACCOUNT_TYPES), size, p=ACCOUNT_WEIGHTS)
+        emergency = rng.integers(0, len(EMERGENCY_TYPES), size)
+        template = rng.integers(0, n_templates, size)
+        location = rng.integers(0, len(LOCATION_NAMES), size)
+        # Roughly 20 updates a minute across the feed; format each minute once
+        minutes_ago = (start + np.arange(size)) // 20
+        first_minute = minutes_ago[0]
+        stamps = _timestamps(now, np.arange(first_minute, minutes_ago[-1] + 1), 'iso').astype(object)
+
+        yield pd.DataFrame({
+            'timestamp': stamps[minutes_ago - first_minute],
+            'source': 'Twitter',
+            'account_type': ACCOUNT_TYPES[account],
+            'username': usernames[rng.integers(0, n_users, size)],
+            'message': messages[(emergency * n_templates + template) * len(LOCATION_NAMES) + location],
+            'location': np.array(LOCATION_NAMES)[location],
+            'trust_score': np.clip(ACCOUNT_TRUST[account] + rng.normal(0, 0.04, size), 0, 1).round(2),
+            'verified': rng.random(size) < ACCOUNT_VERIFIED[account],
+            'engagement': rng.lognormal(6.5, 0.9, size).astype(np.int64),
+            'emergency_type': EMERGENCY_TYPES[emergency],
+        }, index=pd.RangeIndex(start, start + size))
+
+
+def generate_social_updates(n, seed=0, now=None):
+    """Whole feed in one frame; use iter_social_updates for very large n"""
+    return pd.concat(list(iter_social_updates(n, seed=seed, now=now)) or
+                     [pd.DataFrame(columns=SOCIAL_UPDATE_COLUMNS)])
+
+
+def generate_dataset(n_facilities=5, n_updates=10, n_alerts=5, seed=0, now=None):
+    """Same tuple as main.generate_data: (alerts_df, shelters_df, resources_df, social_updates_df)"""
+    now = now or datetime.now()
+    shelters_df, resources_df = generate_facilities(n_facilities, seed, now)
+    return (generate_alerts(n_alerts, seed, now), shelters_df, resources_df,
+            generate_social_updates(n_updates, seed, now))
+
+
+def write_dataset(out_dir, n_facilities, n_updates, n_alerts=1000, seed=0, chunk_size=1_000_000, now=None):
+    """
+    Write the dataset as Parquet: alerts, shelters and resources as single
+    files and social updates as one part file per chunk. Timestamps count
+    back from now (default: the current time), so pass it to write the same
+    files twice. Returns the paths.
+    """
+    try:
+        import pyarrow  # noqa: F401  (pandas needs it for Parquet)
+    except ImportError as e:
+        raise ImportError("write_dataset needs pyarrow for Parquet output: pip install pyarrow") from e
+
+    now = now or datetime.now()
+    os.makedirs(os.path.join(out_dir, 'social_updates'), exist_ok=True)
+    shelters_df, resources_df = generate_facilities(n_facilities, seed, now)
+    paths = {
+        'alerts': os.path.join(out_dir, 'alerts.parquet'),
+        'shelters': os.path.join(out_dir, 'shelters.parquet'),
+        'resources': os.path.join(out_dir, 'resources.parquet'),
+        'social_updates': [],
+    }
+    generate_alerts(n_alerts, seed, now).to_parquet(paths['alerts'], index=False)
+    shelters_df.to_parquet(paths['shelters'], index=False)
+    resources_df.to_parquet(paths['resources'], index=False)
+    for i, chunk in enumerate(iter_social_updates(n_updates, chunk_size, seed, now)):
+        path = os.path.join(out_dir, 'social_updates', f'part-{i:05d}.parquet')
+        chunk.to_parquet(path, index=False)
+        paths['social_updates'].append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic ANTNA dataset as Parquet")
+    parser.add_argument('--facilities', type=int, default=100000)
+    parser.add_argument('--updates', type=int, default=1000000)
+    parser.add_argument('--alerts', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--out', default=os.path.join('data', 'synthetic'))
+    parser.add_argument('--now', type=datetime.fromisoformat, default=None,
+                        help="ISO time the timestamps count back from (default: the current time)")
+    args = parser.parse_args()
+
+    paths = write_dataset(args.out, args.facilities, args.updates, args.alerts, args.seed, args.chunk_size,
+                          now=args.now)
+    print(f"Wrote {args.facilities} facilities, {args.updates} updates and {args.alerts} alerts "
+          f"to {args.out} ({len(paths['social_updates'])} update parts)")
+
+
+if __name__ == '__main__':
+    main()
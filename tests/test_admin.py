@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from fakes import FakeGroq, scenario_reply
+
+admin = pytest.importorskip('admin')
+
+
+def test_stream_records_counts_requested_and_invalid():
+    reply = '[{"facility": "A", "water": 1, "food": 1, "medical": 1, "beds": 10, "current_occupancy": 1, ' \
+            '"last_updated": "2024-01-01 10:00"}, {"facility": "B", "water": -5}]'
+    client = FakeGroq(reply=reply)
+    df = admin.stream_records(client, "system", "Generate {count} for {scenario}", "flood",
+                              admin.RESOURCE_SCHEMA, count=3, max_retries=1)
+    assert len(df) == 2 and client.calls == 2
+    assert df.attrs == {'requested': 3, 'invalid': 2}
+
+
+def test_cancel_stops_a_running_worker():
+    cancel = threading.Event()
+    chunks = []
+
+    client = FakeGroq(reply=scenario_reply, chunk_chars=8)
+    original = client._stream
+
+    def stream(text):
+        for chunk in original(text):
+            chunks.append(chunk)
+            if len(chunks) == 3:
+                # The deadline passes while the reply is still streaming
+                cancel.set()
+            yield chunk
+
+    client._stream = stream
+    df = admin.generate_social_updates(client, "flood", cancel=cancel)
+    assert df.empty and client.calls == 1 and len(chunks) == 3
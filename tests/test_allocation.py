@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from allocation import Allocator, EvacuationPlanner
+
+
+def min_total_time(cost, supply, capacity):
+    """(least total time, fewest unassigned) by successive shortest paths, for small instances"""
+    n_origins, n_shelters = cost.shape
+    # Units flow origin -> shelter; each path found is the cheapest way to place one more batch
+    flow = np.zeros((n_origins, n_shelters), dtype=np.int64)
+    total = 0.0
+    while True:
+        left = supply - flow.sum(axis=1)
+        room = capacity - flow.sum(axis=0)
+        # Bellman-Ford over origins and shelters in the residual graph
+        dist_origin = np.where(left > 0, 0.0, np.inf)
+        dist_shelter = np.full(n_shelters, np.inf)
+        from_origin = np.full(n_shelters, -1)
+        from_shelter = np.full(n_origins, -1)
+        for _ in range(n_origins + n_shelters):
+            through = dist_origin[:, None] + cost
+            best = through.argmin(axis=0)
+            better = through[best, np.arange(n_shelters)] < dist_shelter - 1e-9
+            dist_shelter[better] = through[best, np.arange(n_shelters)][better]
+            from_origin[better] = best[better]
+            back = np.where(flow > 0, dist_shelter[None, :] - cost, np.inf)
+            best = back.argmin(axis=1)
+            better = back[np.arange(n_origins), best] < dist_origin - 1e-9
+            if not better.any():
+                break
+            dist_origin[better] = back[np.arange(n_origins), best][better]
+            from_shelter[better] = best[better]
+        targets = np.flatnonzero((room > 0) & np.isfinite(dist_shelter))
+        if len(targets) == 0:
+            return total, int((supply - flow.sum(axis=1)).sum())
+        shelter = targets[np.argmin(dist_shelter[targets])]
+        # Walk the path back to a source to find how much it can carry
+        path, j = [], shelter
+        amount = room[shelter]
+        while True:
+            i = from_origin[j]
+            path.append((i, j))
+            if from_shelter[i] < 0 or dist_origin[i] == 0 and left[i] > 0:
+                amount = min(amount, left[i])
+                break
+            j = from_shelter[i]
+            path.append((i, j, 'back'))
+            amount = min(amount, flow[i, j])
+        for step in path:
+            flow[step[0], step[1]] += -amount if len(step) == 3 else amount
+        total += amount * dist_shelter[shelter]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_total_time_within_epsilon_per_person(seed):
+    rng = np.random.default_rng(seed)
+    n_origins, n_shelters = rng.integers(2, 12), rng.integers(2, 8)
+    cost = rng.uniform(60, 3600, (n_origins, n_shelters)).round()
+    supply = rng.integers(0, 40, n_origins)
+    capacity = rng.integers(0, 60, n_shelters)
+    epsilon = 1.0
+    allocator = Allocator(cost, supply, capacity, epsilon=epsilon).solve()
+    best, unassigned = min_total_time(cost, supply, capacity)
+
+    flows = allocator.flows
+    assert (flows.sum(axis=0) <= capacity).all()
+    assert (flows.sum(axis=1) + allocator.unassigned == supply).all()
+    assert allocator.unassigned.sum() == unassigned
+    assert best - 1e-6 <= allocator.total_time <= best + epsilon * flows.sum() + 1e-6
+
+
+def test_unreachable_shelters_are_never_used():
+    cost = np.array([[100.0, np.nan], [np.inf, 200.0]])
+    allocator = Allocator(cost, [5, 5], [3, 10]).solve()
+    assert allocator.flows.tolist() == [[3, 0], [0, 5]]
+    assert allocator.unassigned.tolist() == [2, 0]
+
+
+def test_planner_resolves_only_when_inputs_change():
+    planner = EvacuationPlanner(['A', 'B'], ['S1', 'S2'], [[60.0, 600.0], [600.0, 60.0]])
+    assignments, unassigned = planner.plan([10, 10], [15, 15])
+    first = planner.allocator
+    assert assignments.set_index(['origin', 'shelter'])['people'].to_dict() == {('A', 'S1'): 10, ('B', 'S2'): 10}
+    planner.plan([10, 10], [15, 15])
+    assert planner.allocator is first
+    assignments, unassigned = planner.plan([10, 10], [5, 15])
+    assert planner.allocator is not first
+    assert assignments['people'].sum() == 20 and unassigned.sum() == 0
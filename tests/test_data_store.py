@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from data_store import SharedDataStore, StoreReader
+
+
+def test_snapshot_reads_exactly_the_requested_versions(tmp_path):
+    store = SharedDataStore(str(tmp_path / 'store.sqlite'))
+    first = store.write('updates', pd.DataFrame({'message': ['a']}))
+    reader = StoreReader(store)
+    versions, tables = reader.snapshot(versions={'updates': first})
+    assert versions == {'updates': first} and tables['updates']['message'].tolist() == ['a']
+
+    # A publish after the version check must not be served under the old version
+    second = store.write('updates', pd.DataFrame({'message': ['b']}))
+    assert reader.snapshot(versions={'updates': first})[1]['updates']['message'].tolist() == ['a']
+    with pytest.raises(LookupError):
+        StoreReader(store).snapshot(versions={'updates': first})
+    assert reader.snapshot(versions={'updates': second})[1]['updates']['message'].tolist() == ['b']
+
+
+def test_snapshot_without_versions_returns_latest(tmp_path):
+    store = SharedDataStore(str(tmp_path / 'store.sqlite'))
+    store.write('disasters', pd.DataFrame({'type': ['Flood']}))
+    version = store.write('updates', pd.DataFrame({'message': ['a']}))
+    versions, tables = StoreReader(store).snapshot(names=['updates'])
+    assert versions == {'updates': version} and list(tables) == ['updates']
+    assert StoreReader(store).snapshot(versions={}) == ({}, {})
@@ -0,0 +1,21 @@
+import os
+import time
+
+import pandas as pd
+
+from embeddings import EmbeddingStore, HashingEmbedder, prune_stores
+
+
+def build(root, name, messages):
+    df = pd.DataFrame({'message': messages, 'trust_score': 0.9, 'verified': True, 'location': 'Doha'})
+    return EmbeddingStore.from_frame(os.path.join(root, name), df, HashingEmbedder())
+
+
+def test_prune_keeps_current_and_previous_store(tmp_path):
+    for i, name in enumerate(['v1', 'v2', 'v3']):
+        build(str(tmp_path), name, [f"flood near shelter {i}"])
+        os.utime(tmp_path / name, (time.time() + i, time.time() + i))
+    current = build(str(tmp_path), 'v4', ["sandstorm warning"])
+    prune_stores(str(tmp_path), keep=current.path)
+    assert sorted(os.listdir(tmp_path)) == ['v3', 'v4']
+    assert len(current) == 1
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from feed import alert_cards_html, update_cards_html
+
+
+def test_update_cards_with_categorical_account_type_without_citizen():
+    updates = pd.DataFrame({
+        # No Citizen category, so '#888888' isn't among the mapped categories
+        'account_type': pd.Categorical(['Official', 'Media']),
+        'username': ['@moi', '@someone'],
+        'message': ['Roads <closed>', 'Water at Lusail'],
+        'location': ['Doha', 'Lusail'],
+        'trust_score': [0.95, 0.4],
+        'verified': [True, False],
+        'engagement': [1500, 3],
+    })
+    html = update_cards_html(updates)
+    assert html.count("<div class='social-update") == 2
+    assert 'color: #00ff9d' in html and 'color: #ffbe0b' in html
+    assert 'Roads &lt;closed&gt;' in html
+
+
+def test_alert_cards_with_categorical_severity():
+    alerts = pd.DataFrame({
+        'type': ['Sandstorm'], 'location': ['Doha'], 'time': ['2024-01-01 10:00'],
+        'severity': pd.Categorical(['High']), 'description': ['Winds over 80 km/h'],
+    })
+    assert '🔴 Sandstorm Alert' in alert_cards_html(alerts)
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from json_stream import Field, RecordStream, records_to_frame, validate_record
+
+SCHEMA = [
+    Field('kind', 'category', choices=['Sandstorm', 'Flood']),
+    Field('people', 'int', minimum=0),
+    Field('trust', 'float', minimum=0.0, maximum=1.0),
+    Field('verified', 'bool'),
+    Field('time', 'datetime'),
+]
+GOOD = '{"kind": "sandstorm", "people": "1,200", "trust": 0.5, "verified": "yes", "time": "2024-01-01T10:00:00Z"}'
+
+
+def test_validate_record_coerces_values():
+    record = validate_record({'kind': 'FLOOD', 'people': 3.6, 'trust': '0.25', 'verified': 'n',
+                              'time': '2024-01-01 10:00'}, SCHEMA)
+    assert record == {'kind': 'Flood', 'people': 4, 'trust': 0.25, 'verified': False,
+                      'time': pd.Timestamp('2024-01-01 10:00')}
+
+
+@pytest.mark.parametrize('people', ['1e999', 'Infinity', 'NaN', 5000000000, -1])
+def test_int_out_of_range_is_invalid(people):
+    with pytest.raises(ValueError):
+        validate_record({'kind': 'Flood', 'people': people, 'trust': 0.5, 'verified': True,
+                         'time': '2024-01-01'}, SCHEMA)
+
+
+@pytest.mark.parametrize('trust', ['nan', 'inf', 1.5])
+def test_float_out_of_range_is_invalid(trust):
+    with pytest.raises(ValueError):
+        validate_record({'kind': 'Flood', 'people': 1, 'trust': trust, 'verified': True,
+                         'time': '2024-01-01'}, SCHEMA)
+
+
+def test_stream_keeps_good_records_around_bad_ones():
+    reply = ('Here you go:\n```json\n[' + GOOD + ', {"kind": "Flood", "people": 1e999, "trust": 0.1, '
+             '"verified": true, "time": "2024-01-01"}, {"kind": "Hail"}, ' + GOOD + ', {"kind": "Fl')
+    parser = RecordStream(SCHEMA)
+    # Feed in small pieces, the way a streamed reply arrives
+    records = [r for i in range(0, len(reply), 7) for r in parser.feed(reply[i:i + 7])]
+    parser.close()
+    assert len(records) == 2
+    assert [reason for _, reason in parser.invalid][-1] == 'truncated'
+    assert len(parser.invalid) == 3
+
+
+def test_braces_inside_strings_dont_split_records():
+    parser = RecordStream([Field('description', 'str')])
+    records = parser.feed('[{"description": "use {curly} \\"quotes\\""}]')
+    assert records == [{'description': 'use {curly} "quotes"'}]
+
+
+def test_records_to_frame_mixes_timezones():
+    records = [validate_record({'kind': 'Flood', 'people': 1, 'trust': 0.5, 'verified': True, 'time': t}, SCHEMA)
+               for t in ['2024-01-01T10:00:00+03:00', '2024-01-01T10:00:00']]
+    df = records_to_frame(records, SCHEMA)
+    assert df['time'].tolist() == [pd.Timestamp('2024-01-01 07:00'), pd.Timestamp('2024-01-01 10:00')]
+    assert str(df['people'].dtype) == 'int32' and str(df['kind'].dtype) == 'category'
@@ -0,0 +1,13 @@
+import numpy as np
+
+from trust import ReputationCache
+
+
+def test_growth_does_not_copy_stats_to_new_users():
+    cache = ReputationCache()
+    cache.update([f"old{i}" for i in range(1000)], np.full(1000, 0.9))
+    # Pushes the cache past its initial 1024 slots
+    cache.update([f"new{i}" for i in range(100)], np.full(100, 0.1))
+    count, mean = cache.lookup(["old0", "new99", "stranger"])
+    assert count.tolist() == [1, 1, 0]
+    assert np.allclose(mean, [0.9, 0.1, 0])
@@ -0,0 +1,207 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from spatial import haversine_km
+
+
+def _point_key(name, lat, lon):
+    return f"{name}|{float(lat):.6f}|{float(lon):.6f}"
+
+
+class ORSMatrixProvider:
+    """Fills matrix blocks with openrouteservice /matrix requests"""
+
+    def __init__(self, client, profile='driving-car', max_elements=3500):
+        self.client = client
+        self.profile = profile
+        # ORS caps sources x destinations per request
+        self.max_elements = max_elements
+
+    def __call__(self, sources, destinations):
+        sources = np.asarray(sources, dtype=np.float64)
+        destinations = np.asarray(destinations, dtype=np.float64)
+        durations = np.full((len(sources), len(destinations)), np.nan, dtype=np.float32)
+        distances = np.full_like(durations, np.nan)
+        batch = max(1, self.max_elements // max(1, len(sources)))
+        for start in range(0, len(destinations), batch):
+            block = destinations[start:start + batch]
+            points = np.vstack([sources, block])
+            response = self.client.distance_matrix(
+                locations=points[:, ::-1].tolist(),  # ORS wants (lon, lat)
+                profile=self.profile,
+                sources=list(range(len(sources))),
+                destinations=list(range(len(sources), len(points))),
+                metrics=['duration', 'distance'],
+            )
+            # Unroutable pairs come back as None
+            durations[:, start:start + len(block)] = np.array(
+                response['durations'], dtype=np.float64)
+            distances[:, start:start + len(block)] = np.array(
+                response['distances'], dtype=np.float64)
+        return durations, distances
+
+
+class HaversineProvider:
+    """Offline estimate: great-circle distance times a detour factor at a fixed speed"""
+
+    def __init__(self, speed_kmh=40.0, detour_factor=1.3):
+        self.speed_kmh = speed_kmh
+        self.detour_factor = detour_factor
+
+    def __call__(self, sources, destinations):
+        sources = np.asarray(sources, dtype=np.float64)
+        destinations = np.asarray(destinations, dtype=np.float64)
+        km = haversine_km(sources[:, [0]], sources[:, [1]],
+                          destinations[:, 0], destinations[:, 1]) * self.detour_factor
+        return (km / self.speed_kmh * 3600).astype(np.float32), (km * 1000).astype(np.float32)
+
+
+class TravelTimeMatrix:
+    """Duration (s) / distance (m) matrix between fixed origins and every shelter.
+
+    Cells are filled by a provider in blocks and persisted as a compressed .npz
+    holding float32 arrays plus the origin and shelter keys they belong to. A
+    key is the name plus its coordinates, so on refresh only shelters (or
+    origins) whose key is not already in the matrix are sent to the provider.
+    """
+
+    def __init__(self, origins, shelters_df, provider, path=None):
+        self.origin_names = list(origins)
+        self.origin_coords = np.array([origins[name] for name in self.origin_names], dtype=np.float64)
+        self.shelter_names = shelters_df['name'].tolist()
+        self.shelter_coords = shelters_df[['lat', 'lon']].to_numpy(dtype=np.float64)
+        self.origin_keys = [_point_key(n, *c) for n, c in zip(self.origin_names, self.origin_coords)]
+        self.shelter_keys = [_point_key(n, *c) for n, c in zip(self.shelter_names, self.shelter_coords)]
+        self.data_version = hashlib.sha1(
+            "\n".join(self.origin_keys + ["--"] + self.shelter_keys).encode()
+        ).hexdigest()[:12]
+
+        self.provider = provider
+        self.path = path
+        shape = (len(self.origin_names), len(self.shelter_names))
+        self.durations = np.full(shape, np.nan, dtype=np.float32)
+        self.distances = np.full(shape, np.nan, dtype=np.float32)
+        self._filled = np.zeros(shape, dtype=bool)
+        self._origin_pos = {name: i for i, name in enumerate(self.origin_names)}
+        self._shelter_pos = {name: j for j, name in enumerate(self.shelter_names)}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.error = None
+
+        if path and os.path.exists(path):
+            self._load()
+
+    @property
+    def ready(self):
+        return bool(self._filled.all())
+
+    def _load(self):
+        try:
+            saved = np.load(self.path, allow_pickle=False)
+        except (OSError, ValueError):
+            return
+        old_rows = {k: i for i, k in enumerate(saved['origin_keys'].tolist())}
+        old_cols = {k: j for j, k in enumerate(saved['shelter_keys'].tolist())}
+        rows = [(i, old_rows[k]) for i, k in enumerate(self.origin_keys) if k in old_rows]
+        cols = [(j, old_cols[k]) for j, k in enumerate(self.shelter_keys) if k in old_cols]
+        if not rows or not cols:
+            return
+        new_i, old_i = map(np.array, zip(*rows))
+        new_j, old_j = map(np.array, zip(*cols))
+        self.durations[np.ix_(new_i, new_j)] = saved['durations'][np.ix_(old_i, old_j)]
+        self.distances[np.ix_(new_i, new_j)] = saved['distances'][np.ix_(old_i, old_j)]
+        self._filled[np.ix_(new_i, new_j)] = saved['filled'][np.ix_(old_i, old_j)]
+
+    def save(self):
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            tmp_path = self.path + '.tmp.npz'
+            np.savez_compressed(
+                tmp_path,
+                durations=self.durations,
+                distances=self.distances,
+                filled=self._filled,
+                origin_keys=np.array(self.origin_keys),
+                shelter_keys=np.array(self.shelter_keys),
+                data_version=np.array(self.data_version),
+            )
+            os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Compute the cells that are missing, touching only changed shelters/origins"""
+        updates = []
+        # Origins never computed need every shelter
+        new_rows = np.flatnonzero(~self._filled.any(axis=1))
+        if len(new_rows):
+            updates.append((new_rows, np.arange(len(self.shelter_names))))
+        # Remaining gaps are new or moved shelters; fetch just those columns
+        filled = self._filled.copy()
+        filled[new_rows] = True
+        cols = np.flatnonzero(~filled.all(axis=0))
+        if len(cols):
+            rows = np.flatnonzero(~filled[:, cols].all(axis=1))
+            updates.append((rows, cols))
+
+        computed = 0
+        for row_idx, col_idx in updates:
+            durations, distances = self.provider(self.origin_coords[row_idx], self.shelter_coords[col_idx])
+            with self._lock:
+                block = np.ix_(row_idx, col_idx)
+                self.durations[block] = durations
+                self.distances[block] = distances
+                self._filled[block] = True
+            computed += durations.size
+        if computed:
+            self.save()
+        return computed
+
+    def refresh_in_background(self):
+        """Run refresh() on a daemon thread; lookups return None until cells are filled"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error = e
+
+        self._thread = threading.Thread(target=run, name='travel-matrix-refresh', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def filled_durations(self, fallback=None):
+        """Durations (s) as float64, with cells not computed yet taken from fallback, or NaN"""
+        with self._lock:
+            durations = np.where(self._filled, self.durations, np.nan).astype(np.float64)
+        missing = np.isnan(durations)
+        if fallback is not None and missing.any():
+            estimate, _ = fallback(self.origin_coords, self.shelter_coords)
+            durations[missing] = estimate[missing]
+        return durations
+
+    def lookup(self, origin_name, shelter_name):
+        """Return (duration_s, distance_m) or None when the pair is unknown or not computed yet"""
+        i = self._origin_pos.get(origin_name)
+        j = self._shelter_pos.get(shelter_name)
+        if i is None or j is None or not self._filled[i, j] or np.isnan(self.durations[i, j]):
+            return None
+        return float(self.durations[i, j]), float(self.distances[i, j])
+
+    def nearest_by_time(self, origin_name, k=1, mask=None):
+        """Shelter names and durations (s) of the k quickest shelters from an origin"""
+        i = self._origin_pos.get(origin_name)
+        if i is None:
+            return []
+        durations = np.where(self._filled[i], self.durations[i], np.nan)
+        if mask is not None:
+            durations = np.where(np.asarray(mask, dtype=bool), durations, np.nan)
+        valid = np.flatnonzero(~np.isnan(durations))
+        order = valid[np.argsort(durations[valid], kind='stable')[:k]]
+        return [(self.shelter_names[j], float(durations[j])) for j in order]
@@ -0,0 +1,181 @@
+"""
+Trust scores for social updates, computed in NumPy batches.
+
+A score combines four things: a prior for the account type (blended with
+the poster's reputation so far), verification, engagement, and
+corroboration. Corroboration counts the other people posting about the
+same location in the same time window. Reputation and the corroboration
+counts are kept between batches, so scoring a new batch only touches
+that batch's rows, usernames and locations.
+"""
+import numpy as np
+import pandas as pd
+
+# How much an account type is trusted before anything else is known
+ACCOUNT_PRIORS = {'Official': 0.9, 'Emergency': 0.9, 'Healthcare': 0.85, 'Media': 0.7, 'Citizen': 0.5}
+UNKNOWN_PRIOR = 0.4
+
+WEIGHTS = {'account': 0.45, 'verified': 0.2, 'engagement': 0.15, 'corroboration': 0.2}
+
+# Engagement of this size or more counts in full (log scale)
+ENGAGEMENT_CAP = 5000
+# Other posters about a place needed for about 2/3 of the corroboration weight
+CORROBORATION_SCALE = 3.0
+# Posts after which a user's reputation outweighs their account type's prior
+REPUTATION_PRIOR_WEIGHT = 5.0
+
+
+def _hash(values):
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class ReputationCache:
+    """Running mean of each username's evidence score, in growable arrays.
+
+    Usernames map to slots through a dict; counts and means live in NumPy
+    arrays so a whole batch is looked up and folded in with a few array
+    operations. When more than `max_users` are tracked, the users with the
+    fewest posts are dropped.
+    """
+
+    def __init__(self, max_users=200000):
+        self.max_users = max_users
+        self._slots = {}
+        self._count = np.zeros(1024, dtype=np.float64)
+        self._mean = np.zeros(1024, dtype=np.float64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def lookup(self, usernames):
+        """(count, mean) arrays for the given usernames; unknown users have count 0"""
+        slots = np.fromiter((self._slots.get(name, -1) for name in usernames), dtype=np.int64,
+                            count=len(usernames))
+        known = slots >= 0
+        count = np.zeros(len(slots))
+        mean = np.zeros(len(slots))
+        count[known] = self._count[slots[known]]
+        mean[known] = self._mean[slots[known]]
+        return count, mean
+
+    def update(self, usernames, evidence):
+        """Fold a batch of per-post evidence scores into each user's running mean"""
+        codes, uniques = pd.factorize(np.asarray(usernames, dtype=object))
+        n = np.bincount(codes, minlength=len(uniques)).astype(np.float64)
+        total = np.bincount(codes, weights=evidence, minlength=len(uniques))
+
+        slots = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques.tolist()):
+            slot = self._slots.get(name)
+            if slot is None:
+                slot = self._slots[name] = len(self._slots)
+            slots[i] = slot
+        if len(self._slots) > len(self._count):
+            size = max(len(self._slots), 2 * len(self._count))
+            # np.resize would fill the new space with copies of old users
+            count, mean = np.zeros(size), np.zeros(size)
+            count[:len(self._count)] = self._count
+            mean[:len(self._mean)] = self._mean
+            self._count, self._mean = count, mean
+
+        old = self._count[slots]
+        self._count[slots] = old + n
+        self._mean[slots] = (self._mean[slots] * old + total) / (old + n)
+        if len(self._slots) > self.max_users:
+            self._shrink()
+
+    def _shrink(self):
+        size = len(self._slots)
+        keep = np.sort(np.argpartition(-self._count[:size], self.max_users // 2)[:self.max_users // 2])
+        names = np.empty(size, dtype=object)
+        for name, slot in self._slots.items():
+            names[slot] = name
+        self._slots = {name: i for i, name in enumerate(names[keep].tolist())}
+        self._count[:len(keep)] = self._count[keep]
+        self._mean[:len(keep)] = self._mean[keep]
+        self._count[len(keep):] = 0
+
+
+class TrustScorer:
+    """Scores batches of updates and remembers what it has seen.
+
+    Corroboration uses fixed time buckets of `window_minutes`. A post is
+    corroborated by the distinct other usernames posting about its location
+    in its own bucket and the one before it. Buckets older than
+    `horizon_minutes` before the newest one seen are forgotten.
+    """
+
+    def __init__(self, window_minutes=30, horizon_minutes=24 * 60, max_users=200000):
+        self.window_ns = int(window_minutes * 60 * 1e9)
+        self.horizon_buckets = max(2, int(horizon_minutes // window_minutes))
+        self.reputation = ReputationCache(max_users)
+        # bucket -> set of (location, username) hashes, and bucket -> {location hash: posters}
+        self._posters = {}
+        self._counts = {}
+
+    def _corroboration(self, timestamps, locations, usernames):
+        """Distinct other posters per row about the same location in this or the previous bucket"""
+        buckets = pd.to_datetime(timestamps).to_numpy().astype('datetime64[ns]').astype(np.int64) // self.window_ns
+        loc_hash = _hash(locations)
+        pair_hash = loc_hash * np.uint64(1000003) ^ _hash(usernames)
+
+        for bucket in np.unique(buckets).tolist():
+            rows = buckets == bucket
+            pairs, first = np.unique(pair_hash[rows], return_index=True)
+            seen = self._posters.setdefault(bucket, set())
+            new = np.fromiter((pair not in seen for pair in pairs.tolist()), dtype=bool, count=len(pairs))
+            seen.update(pairs[new].tolist())
+            counts = self._counts.setdefault(bucket, {})
+            new_locs, added = np.unique(loc_hash[rows][first[new]], return_counts=True)
+            for loc, n in zip(new_locs.tolist(), added.tolist()):
+                counts[loc] = counts.get(loc, 0) + n
+
+        newest = max(self._counts)
+        for bucket in [b for b in self._counts if b < newest - self.horizon_buckets]:
+            del self._counts[bucket]
+            del self._posters[bucket]
+
+        # Look up per (bucket, location) group rather than per row
+        groups, inverse = np.unique(np.column_stack([buckets, loc_hash.view(np.int64)]), axis=0,
+                                    return_inverse=True)
+        empty = {}
+        posters = np.array([
+            self._counts.get(bucket, empty).get(loc, 0) + self._counts.get(bucket - 1, empty).get(loc, 0)
+            for bucket, loc in zip(groups[:, 0].tolist(), groups[:, 1].view(np.uint64).tolist())
+        ], dtype=np.float64)
+        return np.maximum(posters[inverse.ravel()] - 1, 0)
+
+    def score(self, df):
+        """
+        float32 trust score in [0, 1] per row of a social_updates_df-shaped
+        frame, then fold the batch into reputation and corroboration state.
+        """
+        if len(df) == 0:
+            return np.empty(0, dtype=np.float32)
+        usernames = df['username'].to_numpy(dtype=object)
+        prior = df['account_type'].map(ACCOUNT_PRIORS).fillna(UNKNOWN_PRIOR).to_numpy(np.float64)
+        verified = df['verified'].to_numpy(dtype=bool).astype(np.float64)
+        engagement = np.log1p(np.clip(df['engagement'].to_numpy(np.float64), 0, ENGAGEMENT_CAP)) / np.log1p(
+            ENGAGEMENT_CAP)
+        corroborated = self._corroboration(df['timestamp'], df['location'].to_numpy(dtype=object), usernames)
+        corroboration = 1 - np.exp(-corroborated / CORROBORATION_SCALE)
+
+        # Reputation is shrunk towards the account type's prior until the user has a track record
+        count, mean = self.reputation.lookup(usernames)
+        account = (prior * REPUTATION_PRIOR_WEIGHT + mean * count) / (REPUTATION_PRIOR_WEIGHT + count)
+
+        evidence = (WEIGHTS['verified'] * verified + WEIGHTS['engagement'] * engagement
+                    + WEIGHTS['corroboration'] * corroboration)
+        scores = WEIGHTS['account'] * account + evidence
+        # Reputation tracks what the posts showed, on the same 0-1 scale as the prior
+        self.reputation.update(usernames, evidence / (1 - WEIGHTS['account']))
+        return np.clip(scores, 0, 1).astype(np.float32)
+
+    def score_frame(self, df, chunk_size=100000):
+        """Score a whole feed oldest first in chunks, so reputation builds up in time order"""
+        order = np.argsort(pd.to_datetime(df['timestamp']).to_numpy(), kind='stable')
+        scores = np.empty(len(df), dtype=np.float32)
+        for start in range(0, len(df), chunk_size):
+            rows = order[start:start + chunk_size]
+            scores[rows] = self.score(df.iloc[rows])
+        return scores
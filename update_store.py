@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ['account_type', 'location', 'emergency_type']
+
+
+class UpdateStore:
+    """Social updates sorted on a datetime64 index, with per-source trust indexes.
+
+    Rows are kept in ascending (timestamp, trust_score) order, so a
+    position is also a time order and the feed's newest-first order is the
+    reverse. For each account type, the store keeps that type's positions
+    sorted by trust. A filter is then one binary search per selected type,
+    plus a sort of the matching positions. Positions are cached per (min
+    trust, account types) pair. Time windows are a binary search on the
+    cached positions.
+    """
+
+    def __init__(self, social_updates_df, max_cached_filters=64):
+        frame = social_updates_df.copy()
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        for column in CATEGORY_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].astype('category')
+        frame['trust_score'] = frame['trust_score'].astype(np.float32)
+        frame = frame.sort_values(['timestamp', 'trust_score'], kind='stable')
+        self.frame = frame.set_index('timestamp')
+        self._times = self.frame.index.asi8
+
+        trust = self.frame['trust_score'].to_numpy()
+        codes = self.frame['account_type'].cat.codes.to_numpy()
+        self._by_trust = {}
+        for code, account_type in enumerate(self.frame['account_type'].cat.categories):
+            positions = np.flatnonzero(codes == code)
+            order = np.argsort(trust[positions], kind='stable')
+            self._by_trust[account_type] = (trust[positions][order], positions[order])
+
+        self._cache = OrderedDict()
+        self._max_cached = max_cached_filters
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def account_types(self):
+        return list(self.frame['account_type'].cat.categories)
+
+    def positions(self, min_trust=0.0, account_types=None):
+        """Ascending positions of the rows passing the trust/source filter (cached)"""
+        types = self.account_types if account_types is None else account_types
+        key = (round(float(min_trust), 6), frozenset(types))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        # float32 threshold so 0.7 matches scores stored as float32(0.7)
+        threshold = np.float32(min_trust)
+        parts = []
+        for account_type in key[1]:
+            if account_type not in self._by_trust:
+                continue
+            trust, positions = self._by_trust[account_type]
+            parts.append(positions[np.searchsorted(trust, threshold, side='left'):])
+        result = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+        return result
+
+    def window_start(self, since):
+        """First position with a timestamp at or after `since`"""
+        return int(np.searchsorted(self._times, pd.Timestamp(since).value, side='left'))
+
+    def query(self, min_trust=0.0, account_types=None, since=None):
+        """
+        Filtered updates, newest first (then highest trust), with timestamp
+        as a column. Only the matching rows are copied.
+        """
+        positions = self.positions(min_trust, account_types)
+        if since is not None:
+            positions = positions[np.searchsorted(positions, self.window_start(since)):]
+        return self.frame.iloc[positions[::-1]].reset_index()